@@ -26,6 +26,8 @@ class User(Base):
     sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
     is_active = Column(Boolean, default=True, nullable=False)
     is_verified = Column(Boolean, default=False, nullable=False)
+    # Версия выданных токенов: увеличивается при смене роли, блокировке, смене имени или пароля
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     # orders_rw_author = relationship("OrderRW", back_populates="author",foreign_keys='OrderRW.author_id')
     # orders_rw_manager = relationship("OrderRW", back_populates="manager",foreign_keys='OrderRW.manager_id')
@@ -37,6 +39,10 @@ class UserSession(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     refresh_token = Column(String(255), nullable=True, unique=True)
+    # Предыдущий refresh token и время замены: параллельные запросы со старым токеном
+    # принимаются в течение SESSION_ROTATION_GRACE (см. api.auth.session_index)
+    previous_refresh_token = Column(String(255), nullable=True)
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
     session_start = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     session_end = Column(DateTime(timezone=True), nullable=True)
     traffic = Column(Integer, default=0)
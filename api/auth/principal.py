@@ -0,0 +1,74 @@
+import os
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from api.auth.models import User, Role
+
+# Время жизни записи кэша пользователей (секунды): граница устаревания между процессами
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Изменение этих полей отзывает выданные пользователю токены (users.token_version + 1)
+REVOKING_FIELDS = {"username", "role_id", "is_active", "hashed_password"}
+
+
+# Данные пользователя для проверки доступа
+class Principal(NamedTuple):
+    id: int
+    username: str
+    role_id: Optional[int]
+    role_name: Optional[str]
+    is_active: bool
+    token_version: int
+
+
+# Кэш пользователей для get_current_user / role_required по user_id.
+# Запись сбрасывается при изменении пользователя или роли в этом процессе сразу,
+# в других процессах - не позже чем через ttl секунд. Токен несет версию (claim "ver"):
+# токен новее записи перечитывает пользователя, токен старше - отозван.
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.ttl = ttl
+        self.items = {}
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        item = self.items.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def invalidate(self, user_id: Optional[int] = None):
+        if user_id is None:
+            self.items.clear()
+        else:
+            self.items.pop(user_id, None)
+
+    async def load(self, db: AsyncSession, user_id: int, token_version: int = 0) -> Optional[Principal]:
+        principal = self.get(user_id)
+        if principal is not None and principal.token_version >= token_version:
+            return principal
+        result = await db.execute(
+            select(User.id, User.username, User.role_id, Role.name, User.is_active, User.token_version)
+            .outerjoin(Role, User.role_id == Role.id)
+            .filter(User.id == user_id)
+        )
+        row = result.first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        principal = Principal(*row)
+        self.items[user_id] = (time.monotonic() + self.ttl, principal)
+        return principal
+
+
+principal_cache = PrincipalCache()
+
+
+# Отзыв токенов пользователя при изменении полей доступа (после присваивания, до коммита).
+# Учитывается только реально измененное значение (история атрибута): то же имя, роль
+# или статус в запросе токены не отзывают
+def revoke_tokens(user: User, changed_fields):
+    state = inspect(user)
+    if any(state.attrs[field].history.has_changes() for field in REVOKING_FIELDS.intersection(changed_fields)):
+        user.token_version = (user.token_version or 0) + 1
@@ -4,21 +4,21 @@ from fastapi.security import OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthoriz
 from config.db import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 from datetime import timedelta
 from typing import List
 from jose import jwt, JWTError
 from api.auth.models import User
 from api.auth.schemas import User as UserSchema, UserUpdate, Token
-from config.utils import verify_password
+from config.utils import password_hasher
 from api.auth.routes.token import create_access_token, create_refresh_token, update_tokens, set_tokens_cookie, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
-from api.auth.routes.session import start_user_session, end_user_session
+from api.auth.routes.session import start_user_session, end_user_session, renew_session_token
+from api.auth.principal import Principal, principal_cache, revoke_tokens
 
 bearer_scheme = HTTPBearer()
 router = APIRouter()
 
-# Текущий пользователь
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_db)):
+# Текущий пользователь (из кэша, см. api.auth.principal; в БД - при промахе кэша)
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,23 +33,28 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(b
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    result = await db.execute(select(User).filter(User.username == username))
-    user = result.scalars().first()
-    if user is None:
+    token_version = payload.get("ver", 0)
+    principal = await principal_cache.load(db, user_id, token_version)
+    # Токен выдан до смены имени, роли, пароля или блокировки - отозван
+    if principal is None or principal.username != username or principal.token_version != token_version:
         raise credentials_exception
-    return user
+    return principal
 
 # Статус текущего пользователя
-async def user_status(current_user: User = Depends(get_current_user)):
+async def user_status(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Неактивный пользователь")
     return current_user
 
+# Данные токенов пользователя; "ver" - версия токенов (см. api.auth.principal)
+def user_token_data(user: User):
+    return {"username": user.username, "user_id": user.id, "role": user.role_id, "ver": user.token_version}
+
 # Верификация пользователя
 async def verify_user(db: AsyncSession, username: str, password: str):
     result = await db.execute(select(User).filter(User.username == username))
     user = result.scalars().first()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         return None
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Учетная запись не активна")
@@ -57,10 +62,8 @@ async def verify_user(db: AsyncSession, username: str, password: str):
 
 # Универсальная функция для проверки ролей
 def role_required(roles: List[str]):
-    async def check_roles(current_user: User = Depends(user_status), db: AsyncSession = Depends(get_db)):
-        result = await db.execute(select(User).filter(User.id == current_user.id).options(selectinload(User.role)))
-        user = result.scalars().first()
-        if not user or user.role.name not in roles:
+    async def check_roles(current_user: Principal = Depends(user_status)):
+        if current_user.role_name not in roles:
             raise HTTPException(status_code=403, detail="Недостаточно прав")
         return current_user
     
@@ -75,8 +78,9 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Имя пользователя или пароль указаны не верно")
         
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(data={"username": user.username, "user_id": user.id, "role": user.role_id}, expires_delta=access_token_expires)
-        refresh_token = create_refresh_token(data={"username": user.username, "user_id": user.id, "role": user.role_id})
+        token_data = user_token_data(user)
+        access_token = create_access_token(data=token_data, expires_delta=access_token_expires)
+        refresh_token = create_refresh_token(data=token_data)
 
         client_host = request.client.host
         user_agent = request.headers.get("User-Agent")
@@ -106,12 +110,13 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
 
 # Профиль пользователя
 @router.get("/profile", response_model=UserSchema)
-async def user_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+async def user_profile(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).filter(User.id == current_user.id))
+    return result.scalars().first()
 
 # Обновление профиля
 @router.patch("/profile", response_model=UserSchema)
-async def update_user_profile(user_update: UserUpdate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_user_profile(user_update: UserUpdate, response: Response, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     result = await db.execute(select(User).filter(User.id == current_user.id))
     user = result.scalars().first()
 
@@ -131,15 +136,31 @@ async def update_user_profile(user_update: UserUpdate, db: AsyncSession = Depend
     update_data = user_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user, key, value)
+    revoke_tokens(user, update_data)
+
+    # Смена имени отзывает выданные токены: пользователю сразу выдаются новые
+    # (access token - в заголовке Authorization, refresh token - в cookie)
+    if user.token_version != current_user.token_version:
+        token_data = user_token_data(user)
+        refresh_token = create_refresh_token(data=token_data)
+        await renew_session_token(user.id, refresh_token, db)
+        response.headers["Authorization"] = f"Bearer {create_access_token(data=token_data)}"
+        set_tokens_cookie(response, refresh_token)
 
     await db.commit()
+    principal_cache.invalidate(current_user.id)
     await db.refresh(user)
 
     return user
 
 # Выход
 @router.post("/logout")
-async def logout(request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def logout(request: Request, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     response = JSONResponse({"detail": "Вы успешно вышли из системы"})
     await end_user_session(current_user.id, db, response)
     return response
+
+# Пул хэширования паролей: очередь, время ожидания и выполнения bcrypt
+@router.get("/password_hashing")
+async def password_hashing_stats(current_user: Principal = role_required(["admin"])):
+    return password_hasher.stats()
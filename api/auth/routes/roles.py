@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import delete, update
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.auth.models import Role, User, UserSession
 from api.auth.routes.session import end_user_session
 from api.auth.schemas import RoleCreate
 from api.auth.routes.auth import role_required, user_status, get_current_user
-from typing import List, Dict
+from api.auth.principal import principal_cache
+from typing import List, Dict, Optional
 from datetime import datetime
 
 router = APIRouter()
@@ -61,9 +63,10 @@ async def create_role(role: RoleCreate, db: AsyncSession = Depends(get_db), curr
     return new_role
 
 @router.get("/", response_model=List[RoleCreate])
-async def read_roles(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db), current_user: User = role_required(["admin"])):
-    result = await db.execute(select(Role).offset(skip).limit(limit))
+async def read_roles(response: Response, skip: int = 0, limit: int = 10, after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db), current_user: User = role_required(["admin"])):
+    result = await db.execute(paginate(select(Role), Role.id, skip, limit, after_id))
     roles = result.scalars().all()
+    set_next_cursor(response, roles, limit)
     return roles
 
 @router.get("/{role_id}", response_model=RoleCreate)
@@ -104,13 +107,17 @@ async def delete_role(role_id: int, db: AsyncSession = Depends(get_db), current_
             await db.refresh(guest_role)
 
         users = role.users
+        user_ids = [user.id for user in users]
 
         async with db.begin():
             try:
                 # Завершение сессий пользователей и обновление их роли до "гость"
                 for user in users:
                     await end_user_session(user.id, db)
-                    await db.execute(update(User).where(User.id == user.id).values(role_id=guest_role.id))
+                    await db.execute(
+                        update(User).where(User.id == user.id)
+                        .values(role_id=guest_role.id, token_version=User.token_version + 1)
+                    )
 
                 await db.flush()
 
@@ -122,6 +129,8 @@ async def delete_role(role_id: int, db: AsyncSession = Depends(get_db), current_
                 raise HTTPException(status_code=500, detail=str(e))
             else:
                 await db.commit()
+                for user_id in user_ids:
+                    principal_cache.invalidate(user_id)
 
         # Создание сообщения с информацией о перемещенных пользователях
         detail_message = (
@@ -1,10 +1,12 @@
 #api.auth.routes.session.py
 from fastapi import Response
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import datetime
 from api.auth.models import UserSession
 from api.auth.routes.token import clear_cookies
+from api.auth.session_index import session_index
 
 # Cтарт сессии
 async def start_user_session(user_id: int, refresh_token: str, ip_address: str, user_agent: str, traffic: int, db: AsyncSession):
@@ -27,13 +29,33 @@ async def start_user_session(user_id: int, refresh_token: str, ip_address: str,
         )
         db.add(new_session)
     await db.commit()
+    session_index.add(user_id, refresh_token)
 
-# Окончание сессии
-async def end_user_session(user_id: int, db: AsyncSession, response: Response):
-    result = await db.execute(select(UserSession).filter(UserSession.user_id == user_id, UserSession.session_end == None))
-    session = result.scalars().first()
-
-    if session:
-        session.session_end = datetime.utcnow()
-        clear_cookies(response)
+# Окончание сессии: одним UPDATE без предварительного SELECT, сессия удаляется из индекса.
+# С refresh_token сессия завершается, только если это ее текущий токен
+# (устаревший токен не завершает сессию, начатую или продленную после него)
+async def end_user_session(user_id: int, db: AsyncSession, response: Response = None, refresh_token: str = None):
+    query = update(UserSession).where(UserSession.user_id == user_id, UserSession.session_end == None)
+    if refresh_token is not None:
+        query = query.where(UserSession.refresh_token == refresh_token)
+    result = await db.execute(query.values(session_end=datetime.utcnow()))
+    had_session = session_index.has_session(user_id)
+    if refresh_token is None or result.rowcount:
+        session_index.remove(user_id)
+    else:
+        had_session = False
+    if had_session or result.rowcount:
+        if response is not None:
+            clear_cookies(response)
         await db.commit()
+
+# Новый refresh token активной сессии (перевыпуск токенов после смены имени);
+# коммитит транзакцию вызывающего вместе с заменой токена
+async def renew_session_token(user_id: int, refresh_token: str, db: AsyncSession):
+    await db.execute(
+        update(UserSession)
+        .where(UserSession.user_id == user_id, UserSession.session_end == None)
+        .values(refresh_token=refresh_token)
+    )
+    await db.commit()
+    session_index.add(user_id, refresh_token)
@@ -34,11 +34,13 @@ def update_tokens(refresh_token: str):
         username: str = payload.get("username")
         user_id: int = payload.get("user_id")
         role_id: int = payload.get("role")
+        token_version: int = payload.get("ver", 0)
         if username is None or user_id is None:
             raise JWTError("Invalid refresh token")
 
-        new_access_token = create_access_token(data={"username": username, "user_id": user_id, "role": role_id})
-        new_refresh_token = create_refresh_token(data={"username": username, "user_id": user_id, "role": role_id})
+        data = {"username": username, "user_id": user_id, "role": role_id, "ver": token_version}
+        new_access_token = create_access_token(data=data)
+        new_refresh_token = create_refresh_token(data=data)
 
         return new_access_token, new_refresh_token
     except JWTError:
@@ -9,7 +9,8 @@ from api.auth.models import User, Role, UserSession
 from api.auth.schemas import UserCreate, UserUpdate,UserDelete, User as UserSchema
 from api.auth.routes.roles import get_role
 from api.auth.routes.auth import role_required, user_status, get_current_user
-from config.utils import get_password_hash
+from api.auth.principal import principal_cache, revoke_tokens
+from config.utils import password_hasher
 from datetime import datetime
 from typing import List, Dict
 
@@ -34,7 +35,7 @@ async def create_initial_user(db: AsyncSession):
             company="",
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
-            hashed_password=get_password_hash("admin"),
+            hashed_password=await password_hasher.hash("admin"),
             role_id=admin_role.id,
             is_active=True,  
             is_verified=True  
@@ -66,7 +67,7 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db), curr
 
         # Создаем нового пользователя
         new_user_data = user.dict(exclude={"password"})  # Исключаем пароль
-        new_user_data["hashed_password"] = get_password_hash(user.password)  # Хэшируем пароль
+        new_user_data["hashed_password"] = await password_hasher.hash(user.password)  # Хэшируем пароль
         new_user_data["created_at"] = datetime.utcnow()
 
         if not new_user_data.get("role_id"):
@@ -154,12 +155,14 @@ async def update_user(user_id: int, user: UserUpdate, db: AsyncSession = Depends
         # Prepare update data
         update_data = user.dict(exclude_unset=True)
         if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+            update_data["hashed_password"] = await password_hasher.hash(update_data.pop("password"))
 
         for key, value in update_data.items():
             setattr(db_user, key, value)
+        revoke_tokens(db_user, update_data)
 
         await db.commit()
+        principal_cache.invalidate(user_id)
         await db.refresh(db_user)
 
         await load_user_relations(db_user, db)
@@ -197,5 +200,6 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db),  current
     # Удаление пользователя
     await db.execute(delete(User).where(User.id == user_id))
     await db.commit()
+    principal_cache.invalidate(user_id)
     
     return UserDelete(detail=f"Пользователь ID {user_id} - {user.username} успешно удален", user=user_data)
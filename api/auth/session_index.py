@@ -0,0 +1,123 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from api.auth.models import UserSession
+
+# Через сколько секунд запись индекса перепроверяется по БД (сессии из других процессов)
+SESSION_INDEX_TTL = float(os.getenv("SESSION_INDEX_TTL", "60"))
+# Сколько секунд после обновления токенов принимается прежний refresh token
+# (параллельные запросы, отправленные с ним до получения нового)
+SESSION_ROTATION_GRACE = float(os.getenv("SESSION_ROTATION_GRACE", "30"))
+
+
+# Ключ сессии в индексе (jti): хэш refresh token вместо самого токена
+def token_hash(token: str) -> str:
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+# Индекс активных сессий в памяти: хэш refresh token -> (user_id, время проверки).
+# Загружается при старте, обновляется при входе, обновлении токенов и выходе;
+# таблица user_sessions остается источником истины: промах и устаревшая запись
+# проверяются по ней. Другие процессы узнают о замене или завершении сессии
+# не позже чем через ttl секунд; замена токена (rotate) всегда идет условным
+# UPDATE по БД, поэтому устаревшая запись не позволяет обновить токены дважды.
+class SessionIndex:
+    def __init__(self, ttl: float = SESSION_INDEX_TTL, grace: float = SESSION_ROTATION_GRACE):
+        self.ttl = ttl
+        self.grace = grace
+        self.tokens = {}
+        self.users = {}
+        # Замененные токены: хэш прежнего refresh token -> (user_id, новый токен, срок приема)
+        self.rotated = {}
+
+    async def load(self, db: AsyncSession):
+        result = await db.execute(
+            select(UserSession.user_id, UserSession.refresh_token)
+            .filter(UserSession.session_end == None, UserSession.refresh_token != None)
+        )
+        self.tokens.clear()
+        self.users.clear()
+        self.rotated.clear()
+        for user_id, refresh_token in result.all():
+            self.add(user_id, refresh_token)
+        return len(self.tokens)
+
+    def add(self, user_id: int, refresh_token: str):
+        self.remove(user_id)
+        key = token_hash(refresh_token)
+        self.tokens[key] = (user_id, time.monotonic())
+        self.users[user_id] = key
+
+    def remove(self, user_id: int):
+        key = self.users.pop(user_id, None)
+        if key is not None:
+            self.tokens.pop(key, None)
+        self.rotated = {key: item for key, item in self.rotated.items() if item[0] != user_id}
+
+    def has_session(self, user_id: int) -> bool:
+        return user_id in self.users
+
+    # Текущий refresh token сессии для предъявленного: он сам, если активен; новый токен,
+    # если предъявленный заменен не раньше чем grace секунд назад; None - сессии нет.
+    # В БД - только при промахе или устаревшей записи.
+    async def resolve(self, db: AsyncSession, refresh_token: str) -> Optional[str]:
+        key = token_hash(refresh_token)
+        now = time.monotonic()
+        item = self.tokens.get(key)
+        if item is not None and now - item[1] < self.ttl:
+            return refresh_token
+        rotated = self.rotated.get(key)
+        if rotated is not None and rotated[2] > now:
+            return rotated[1]
+        result = await db.execute(
+            select(UserSession.user_id, UserSession.refresh_token)
+            .filter(
+                UserSession.session_end == None,
+                or_(
+                    UserSession.refresh_token == refresh_token,
+                    and_(
+                        UserSession.previous_refresh_token == refresh_token,
+                        UserSession.rotated_at >= datetime.utcnow() - timedelta(seconds=self.grace),
+                    ),
+                ),
+            )
+        )
+        row = result.first()
+        if row is None:
+            if item is not None:
+                self.remove(item[0])
+            return None
+        self.add(row.user_id, row.refresh_token)
+        return row.refresh_token
+
+    # Замена refresh token сессии при обновлении токенов; None - токен уже заменен
+    # (параллельным запросом, в т.ч. в другом процессе) или сессия завершена
+    async def rotate(self, db: AsyncSession, refresh_token: str, new_refresh_token: str) -> Optional[int]:
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.refresh_token == refresh_token, UserSession.session_end == None)
+            .values(refresh_token=new_refresh_token, previous_refresh_token=refresh_token,
+                    rotated_at=datetime.utcnow())
+            .returning(UserSession.user_id)
+        )
+        user_id = result.scalar()
+        await db.commit()
+        if user_id is None:
+            # Устаревшая запись индекса: следующая проверка токена идет в БД
+            item = self.tokens.pop(token_hash(refresh_token), None)
+            if item is not None and self.users.get(item[0]) == token_hash(refresh_token):
+                del self.users[item[0]]
+        else:
+            self.add(user_id, new_refresh_token)
+            now = time.monotonic()
+            self.rotated = {key: item for key, item in self.rotated.items() if item[2] > now}
+            self.rotated[token_hash(refresh_token)] = (user_id, new_refresh_token, now + self.grace)
+        return user_id
+
+
+session_index = SessionIndex()
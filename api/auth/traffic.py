@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+from sqlalchemy import bindparam, update
+from api.auth.models import UserSession
+from config.db import async_session
+
+logger = logging.getLogger(__name__)
+
+# Период записи накопленного трафика сессий в БД (секунды)
+TRAFFIC_FLUSH_SECONDS = float(os.getenv("TRAFFIC_FLUSH_SECONDS", "10"))
+
+
+# Учет трафика сессий пользователей.
+# Запрос только прибавляет байты к счетчику пользователя в памяти (учитываются только
+# запросы с проверенным токеном, так что счетчиков не больше, чем пользователей);
+# счетчики раз в TRAFFIC_FLUSH_SECONDS записываются в активные сессии user_sessions
+# одним пакетным UPDATE (и при остановке приложения). Запрос не открывает транзакцию
+# и не ждет коммита.
+class TrafficAccounting:
+    def __init__(self, interval: float = TRAFFIC_FLUSH_SECONDS, session_factory=async_session):
+        self.interval = interval
+        self.session_factory = session_factory
+        self.pending = {}
+        self.lock = asyncio.Lock()
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def add(self, user_id: int, traffic: int):
+        if traffic:
+            self.pending[user_id] = self.pending.get(user_id, 0) + traffic
+
+    async def loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Ошибка записи трафика сессий")
+
+    # Запись накопленного трафика; при ошибке счетчики возвращаются в очередь
+    async def flush(self):
+        async with self.lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, {}
+            table = UserSession.__table__
+            stmt = (
+                update(table)
+                .where(table.c.user_id == bindparam("user"), table.c.session_end.is_(None))
+                .values(traffic=table.c.traffic + bindparam("amount"))
+            )
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(stmt, [{"user": user_id, "amount": amount} for user_id, amount in pending.items()])
+                    await session.commit()
+            except Exception:
+                for user_id, amount in pending.items():
+                    self.add(user_id, amount)
+                raise
+            return len(pending)
+
+
+traffic_accounting = TrafficAccounting()
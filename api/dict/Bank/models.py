@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index, text
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -6,10 +6,17 @@ from config.db import Base
 # Класс - Банк
 class Bank(Base):
     __tablename__ = "banks"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_banks_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), nullable=True)
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     bik = Column(String(50), nullable=True)
     city = Column(String(100), nullable=True)
 
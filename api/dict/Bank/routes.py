@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Bank.schemas import BankInDBBase, BankCreate, BankUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Bank.models import Bank
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -13,13 +14,15 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[BankInDBBase])
-async def read_banks(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_banks(response: Response, skip: int = 0, limit: int = 10,
+                     after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Bank)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Bank),
+            Bank.id, skip, limit, after_id
+        ))
         banks = result.scalars().all()
+        set_next_cursor(response, banks, limit)
         return [BankInDBBase.from_orm(bank) for bank in banks]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read bank: {str(e)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -6,10 +6,17 @@ from config.db import Base
 # Класс - Банковские счета контрагентов
 class BankAccount(Base):
     __tablename__ = "bank_accounts"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_bank_accounts_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     number = Column(String(150), default="")
     currency_id = Column(Integer, ForeignKey('currencies.id'), nullable=False)
     bank_id = Column(Integer, ForeignKey('banks.id'), nullable=False)
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.BankAccountOrg.models import BankAccountOrg
 from api.dict.BankAccountOrg.schemas import BankAccountOrgInDBBase, BankAccountOrgRelate, BankAccountOrgCreate, BankAccountOrgUpdate
-from typing import List
+from typing import List, Optional
 from api.dict.Bank.schemas import BankInDBBase
 from api.dict.Currency.schemas import CurrencyInDBBase
 from api.dict.Organization.schemas import OrganizationInDBBase
@@ -16,18 +17,20 @@ router = APIRouter()
 
 # Список
 @router.get("/", response_model=List[BankAccountOrgRelate])
-async def read_bank_account_orgs(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_bank_account_orgs(response: Response, skip: int = 0, limit: int = 10,
+                                 after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(BankAccountOrg)
             .options(
                 selectinload(BankAccountOrg.currency),
                 selectinload(BankAccountOrg.bank),
                 selectinload(BankAccountOrg.owner)
-            )
-            .offset(skip).limit(limit)
-        )
+            ),
+            BankAccountOrg.id, skip, limit, after_id
+        ))
         bank_account_orgs = result.scalars().all()
+        set_next_cursor(response, bank_account_orgs, limit)
 
         # Заполнение данных country_data для каждой организации
         for bank_account_org in bank_account_orgs:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -6,10 +6,17 @@ from config.db import Base
 # Класс - Договора
 class Contract(Base):
     __tablename__ = "contracts"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_contracts_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     number = Column(String(150), default="")
     from_date = Column(Date)
     to_date = Column(Date)
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Contract.models import Contract
 from api.dict.Contract.schemas import ContractInDBBase, ContractRelate, ContractCreate, ContractUpdate
-from typing import List
+from typing import List, Optional
 from api.dict.Organization.schemas import OrganizationRelate
 from api.dict.Currency.schemas import CurrencyInDBBase
 from api.dict.Contractor.schemas import ContractorRelate
@@ -16,18 +17,20 @@ router = APIRouter()
 
 # Список
 @router.get("/", response_model=List[ContractRelate])
-async def read_contracts(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_contracts(response: Response, skip: int = 0, limit: int = 10,
+                         after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Contract)
             .options(
                 selectinload(Contract.organization),
                 selectinload(Contract.contractor),
                 selectinload(Contract.currency)
-            )
-            .offset(skip).limit(limit)
-        )
+            ),
+            Contract.id, skip, limit, after_id
+        ))
         contracts = result.scalars().all()
+        set_next_cursor(response, contracts, limit)
 
         # Заполнение данных country_data для каждой организации
         for contract in contracts:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from api.dict.OwnerType.models import OwnerType
 from config.db import Base
@@ -7,10 +7,17 @@ from config.db import Base
 # Класс - Контрагент
 class Contractor(Base):
     __tablename__ = "contractors"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_contractors_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     full_name = Column(String(300), default="")
     bin = Column(String(15), nullable=False)
     kbe = Column(String(10), default="")
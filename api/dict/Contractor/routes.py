@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Contractor.models import Contractor
 from api.dict.Contractor.schemas import ContractorInDBBase, ContractorCreate, ContractorUpdate, ContractorRelate
-from typing import List
+from typing import List, Optional
 from api.dict.Country.schemas import CountryInDBBase
 
 router = APIRouter()
@@ -14,14 +15,16 @@ router = APIRouter()
 
 # Список
 @router.get("/", response_model=List[ContractorRelate])
-async def read_contractors(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_contractors(response: Response, skip: int = 0, limit: int = 10,
+                           after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Contractor)
-            .options(selectinload(Contractor.country))
-            .offset(skip).limit(limit)
-        )
+            .options(selectinload(Contractor.country)),
+            Contractor.id, skip, limit, after_id
+        ))
         contractors = result.scalars().all()
+        set_next_cursor(response, contractors, limit)
 
         # Заполнение данных country_data для каждой организации
         for contractor in contractors:
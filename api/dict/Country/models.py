@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum, Index, text
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -7,10 +7,17 @@ from config.db import Base
 # Класс - Страна
 class Country(Base):
     __tablename__ = "countries"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_countries_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     full_name = Column(String(300), default="")
     code = Column(String(5), nullable=False)
 
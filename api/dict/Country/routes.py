@@ -1,23 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Country.models import Country
 from api.dict.Country.schemas import CountryInDBBase, CountryCreate, CountryUpdate
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
 
 # Список стран
 @router.get("/", response_model=List[CountryInDBBase])
-async def read_countries(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_countries(response: Response, skip: int = 0, limit: int = 10,
+                         after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Country)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Country),
+            Country.id, skip, limit, after_id
+        ))
         countries = result.scalars().all()
+        set_next_cursor(response, countries, limit)
         return [CountryInDBBase.from_orm(country) for country in countries]
     except Exception as e:
         print(f"Ошибка чтения стран: {str(e)}")
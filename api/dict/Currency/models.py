@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index, text
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -6,10 +6,17 @@ from config.db import Base
 # Класс - валюта
 class Currency(Base):
     __tablename__ = "currencies"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_currencies_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     code = Column(String(3), nullable=False)
     copybook_parameters_ru = Column(String(200), default="")
     copybook_parameters_en = Column(String(200), default="")
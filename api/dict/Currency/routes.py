@@ -1,23 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Currency.models import Currency
 from api.dict.Currency.schemas import CurrencyInDBBase, CurrencyCreate, CurrencyUpdate
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
 
 # Список валют
 @router.get("/", response_model=List[CurrencyInDBBase])
-async def read_currencies(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_currencies(response: Response, skip: int = 0, limit: int = 10,
+                          after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Currency)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Currency),
+            Currency.id, skip, limit, after_id
+        ))
         currencies = result.scalars().all()
+        set_next_cursor(response, currencies, limit)
         return [CurrencyInDBBase.from_orm(currency) for currency in currencies]
     except Exception as e:
         print(f"Ошибка чтения валют: {str(e)}")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum, Index
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -7,6 +7,11 @@ from config.db import Base
 # Класс - ЕТСНГ
 class Etsng(Base):
     __tablename__ = "etsng"
+    # Индексы для поиска (PostgreSQL): префикс кода и подстрока наименования
+    __table_args__ = (
+        Index("ix_etsng_code_pattern", "code", postgresql_ops={"code": "varchar_pattern_ops"}),
+        Index("ix_etsng_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), nullable=False)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Etsng.schemas import EtsngInDBBase, EtsngCreate, EtsngUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
+from config.search import SearchItem, etsng_index, search_filter
 from api.dict.Etsng.models import Etsng
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -13,19 +15,43 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[EtsngInDBBase])
-async def read_etsngs(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_etsngs(response: Response, skip: int = 0, limit: int = 10,
+                      after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Etsng)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Etsng),
+            Etsng.id, skip, limit, after_id
+        ))
         etsngs = result.scalars().all()
+        set_next_cursor(response, etsngs, limit)
         return [EtsngInDBBase.from_orm(etsng) for etsng in etsngs]
     except Exception as e:
         print(f"Ошибка чтения ставок НДС: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to read etsng: {str(e)}")
 
 
+# Поиск ЕТСНГ: код по префиксу, наименование по подстроке без учета регистра
+@router.get("/search", response_model=List[EtsngInDBBase])
+async def search_etsngs(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100),
+                        db: AsyncSession = Depends(get_db)):
+    try:
+        result = await db.execute(
+            select(Etsng).where(search_filter(Etsng, q)).order_by(Etsng.code).limit(limit)
+        )
+        return [EtsngInDBBase.from_orm(item) for item in result.scalars().all()]
+    except Exception as e:
+        print(f"Ошибка поиска ЕТСНГ: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to search etsng: {str(e)}")
+
+
+# Автодополнение ЕТСНГ по индексу в памяти
+@router.get("/autocomplete", response_model=List[SearchItem])
+async def autocomplete_etsngs(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100),
+                              db: AsyncSession = Depends(get_db)):
+    await etsng_index.ensure(db)
+    return etsng_index.search(q, limit)
+
+
 # НДС по идентификатору
 @router.get("/{etsng_id}", response_model=EtsngInDBBase)
 async def read_etsng(etsng_id: int, db: AsyncSession = Depends(get_db)):
@@ -50,6 +76,7 @@ async def create_or_update_etsng(etsng: EtsngCreate, db: AsyncSession = Depends(
         new_etsng = Etsng(**etsng.dict())
         db.add(new_etsng)
         await db.commit()
+        etsng_index.invalidate()
         await db.refresh(new_etsng)
         return EtsngInDBBase.from_orm(new_etsng)
     except Exception as e:
@@ -70,6 +97,7 @@ async def delete_etsng(etsng_id: int, db: AsyncSession = Depends(get_db)):
 
         await db.delete(etsng)
         await db.commit()
+        etsng_index.invalidate()
         return EtsngInDBBase.from_orm(etsng)
     except Exception as e:
         print(f"Ошибка удаления валюты: {str(e)}")
@@ -92,6 +120,7 @@ async def update_etsng(etsng_id: int, etsng_update: EtsngUpdate, db: AsyncSessio
             setattr(existing_etsng, key, value)
 
         await db.commit()
+        etsng_index.invalidate()
         await db.refresh(existing_etsng)
         return EtsngInDBBase.from_orm(existing_etsng)
     except Exception as e:
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from config.db import Base
 
 
 # Класс - ГНГ
 class Gng(Base):
     __tablename__ = "gng"
+    # Индексы для поиска (PostgreSQL): префикс кода и подстрока наименования
+    __table_args__ = (
+        Index("ix_gng_code_pattern", "code", postgresql_ops={"code": "varchar_pattern_ops"}),
+        Index("ix_gng_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(300), nullable=False)
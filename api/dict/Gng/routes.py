@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Gng.schemas import GngInDBBase, GngCreate, GngUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
+from config.search import SearchItem, gng_index, search_filter
 from api.dict.Gng.models import Gng
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -13,19 +15,43 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[GngInDBBase])
-async def read_gngs(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_gngs(response: Response, skip: int = 0, limit: int = 10,
+                    after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Gng)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Gng),
+            Gng.id, skip, limit, after_id
+        ))
         gngs = result.scalars().all()
+        set_next_cursor(response, gngs, limit)
         return [GngInDBBase.from_orm(gng) for gng in gngs]
     except Exception as e:
         print(f"Ошибка чтения ставок НДС: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to read gng: {str(e)}")
 
 
+# Поиск ГНГ: код по префиксу, наименование по подстроке без учета регистра
+@router.get("/search", response_model=List[GngInDBBase])
+async def search_gngs(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100),
+                      db: AsyncSession = Depends(get_db)):
+    try:
+        result = await db.execute(
+            select(Gng).where(search_filter(Gng, q)).order_by(Gng.code).limit(limit)
+        )
+        return [GngInDBBase.from_orm(item) for item in result.scalars().all()]
+    except Exception as e:
+        print(f"Ошибка поиска ГНГ: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to search gng: {str(e)}")
+
+
+# Автодополнение ГНГ по индексу в памяти
+@router.get("/autocomplete", response_model=List[SearchItem])
+async def autocomplete_gngs(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100),
+                            db: AsyncSession = Depends(get_db)):
+    await gng_index.ensure(db)
+    return gng_index.search(q, limit)
+
+
 # НДС по идентификатору
 @router.get("/{gng_id}", response_model=GngInDBBase)
 async def read_gng(gng_id: int, db: AsyncSession = Depends(get_db)):
@@ -50,6 +76,7 @@ async def create_or_update_gng(gng: GngCreate, db: AsyncSession = Depends(get_db
         new_gng = Gng(**gng.dict())
         db.add(new_gng)
         await db.commit()
+        gng_index.invalidate()
         await db.refresh(new_gng)
         return GngInDBBase.from_orm(new_gng)
     except Exception as e:
@@ -70,6 +97,7 @@ async def delete_gng(gng_id: int, db: AsyncSession = Depends(get_db)):
 
         await db.delete(gng)
         await db.commit()
+        gng_index.invalidate()
         return GngInDBBase.from_orm(gng)
     except Exception as e:
         print(f"Ошибка удаления валюты: {str(e)}")
@@ -92,6 +120,7 @@ async def update_gng(gng_id: int, gng_update: GngUpdate, db: AsyncSession = Depe
             setattr(existing_gng, key, value)
 
         await db.commit()
+        gng_index.invalidate()
         await db.refresh(existing_gng)
         return GngInDBBase.from_orm(existing_gng)
     except Exception as e:
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Operation.models import Operation
 from api.dict.Operation.schemas import OperationInDBBase, OperationCreate, OperationUpdate, OperationRelate
-from typing import List
+from typing import List, Optional
 from api.dict.Vat.schemas import VatInDBBase
 
 router = APIRouter()
@@ -14,14 +15,16 @@ router = APIRouter()
 
 # Список
 @router.get("/", response_model=List[OperationRelate])
-async def read_operations(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_operations(response: Response, skip: int = 0, limit: int = 10,
+                          after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Operation)
-            .options(selectinload(Operation.vat))
-            .offset(skip).limit(limit)
-        )
+            .options(selectinload(Operation.vat)),
+            Operation.id, skip, limit, after_id
+        ))
         operations = result.scalars().all()
+        set_next_cursor(response, operations, limit)
 
         # Заполнение данных country_data для каждой организации
         for operation in operations:
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Numeric, Enum, Index, text
 from sqlalchemy.orm import relationship
 from api.dict.OwnerType.models import OwnerType
 from config.db import Base
@@ -8,10 +8,17 @@ from config.db import Base
 # Класс - Организация
 class Organization(Base):
     __tablename__ = "organizations"
+    # Ключ загрузки из 1С: guid уникален среди заполненных
+    __table_args__ = (
+        Index("ux_organizations_guid", "guid", unique=True,
+              postgresql_where=text("guid <> ''"), sqlite_where=text("guid <> ''")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
     guid = Column(String(100), default="")
+    # Хеш записи последней загрузки из 1С: неизмененные записи не перезаписываются
+    source_hash = Column(String(32), default="")
     full_name = Column(String(300), default="")
     bin = Column(String(15), nullable=False)
     kbe = Column(String(10), default="")
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Organization.models import Organization
 from api.dict.Organization.schemas import OrganizationInDBBase, OrganizationCreate, OrganizationUpdate, OrganizationRelate
-from typing import List
+from typing import List, Optional
 from api.dict.Country.schemas import CountryInDBBase
 
 router = APIRouter()
@@ -14,14 +15,16 @@ router = APIRouter()
 
 # Список
 @router.get("/", response_model=List[OrganizationRelate])
-async def read_organizations(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_organizations(response: Response, skip: int = 0, limit: int = 10,
+                             after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Organization)
-            .options(selectinload(Organization.country))
-            .offset(skip).limit(limit)
-        )
+            .options(selectinload(Organization.country)),
+            Organization.id, skip, limit, after_id
+        ))
         organizations = result.scalars().all()
+        set_next_cursor(response, organizations, limit)
 
         # Заполнение данных country_data для каждой организации
         for organization in organizations:
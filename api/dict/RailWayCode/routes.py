@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from api.dict.RailWayCode.schemas import RailWayCodeInDBBase, RailWayCodeUpdate, RailWayCodeCreate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.RailWayCode.models import RailWayCode
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[RailWayCodeInDBBase])
-async def read_obj(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_obj(response: Response, skip: int = 0, limit: int = 10,
+                   after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(RailWayCode).offset(skip).limit(limit))
+        result = await db.execute(paginate(select(RailWayCode), RailWayCode.id, skip, limit, after_id))
         rwcode = result.scalars().all()
+        set_next_cursor(response, rwcode, limit)
         return [RailWayCodeInDBBase.from_orm(rwcode) for rwcode in rwcode]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read rw codes: {str(e)}")
@@ -1,24 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.ServiceType.schemas import ServiceTypeInDBBase, ServiceTypeCreate, ServiceTypeUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.ServiceType.models import ServiceType
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[ServiceTypeInDBBase])
-async def read_service_types(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_service_types(response: Response, skip: int = 0, limit: int = 10,
+                             after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(ServiceType)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(ServiceType),
+            ServiceType.id, skip, limit, after_id
+        ))
         service_types = result.scalars().all()
+        set_next_cursor(response, service_types, limit)
         return [ServiceTypeInDBBase.from_orm(service_type) for service_type in service_types]
     except Exception as e:
         print(f"Ошибка чтения видов услуг: {str(e)}")
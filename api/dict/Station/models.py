@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Index, ForeignKey
 from sqlalchemy.orm import relationship
 from config.db import Base
 
@@ -6,6 +6,11 @@ from config.db import Base
 # Класс - ЖД станции
 class Station(Base):
     __tablename__ = "stations"
+    # Индексы для поиска (PostgreSQL): префикс кода и подстрока наименования
+    __table_args__ = (
+        Index("ix_stations_code_pattern", "code", postgresql_ops={"code": "varchar_pattern_ops"}),
+        Index("ix_stations_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(150), nullable=False)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -6,8 +6,10 @@ from sqlalchemy.orm import selectinload
 from api.dict.Station.schemas import StationRelate, StationCreate, StationUpdate, StationInDBBase
 from api.dict.Territory.schemas import TerritoryInDBBase
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
+from config.search import SearchItem, station_index, search_filter
 from api.dict.Station.models import Station
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -15,14 +17,16 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[StationRelate])
-async def read_stations(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_stations(response: Response, skip: int = 0, limit: int = 10,
+                        after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Station)
-            .options(selectinload(Station.territory))
-            .offset(skip).limit(limit)
-        )
+            .options(selectinload(Station.territory)),
+            Station.id, skip, limit, after_id
+        ))
         stations = result.scalars().all()
+        set_next_cursor(response, stations, limit)
 
         for station in stations:
             if station.territory:
@@ -34,6 +38,28 @@ async def read_stations(skip: int = 0, limit: int = 10, db: AsyncSession = Depen
         raise HTTPException(status_code=500, detail=f"Failed to read station: {str(e)}")
 
 
+# Поиск станций: код по префиксу, наименование по подстроке без учета регистра
+@router.get("/search", response_model=List[StationInDBBase])
+async def search_stations(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100),
+                          db: AsyncSession = Depends(get_db)):
+    try:
+        result = await db.execute(
+            select(Station).where(search_filter(Station, q)).order_by(Station.code).limit(limit)
+        )
+        return [StationInDBBase.from_orm(item) for item in result.scalars().all()]
+    except Exception as e:
+        print(f"Ошибка поиска станций: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to search station: {str(e)}")
+
+
+# Автодополнение станций по индексу в памяти
+@router.get("/autocomplete", response_model=List[SearchItem])
+async def autocomplete_stations(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100),
+                                db: AsyncSession = Depends(get_db)):
+    await station_index.ensure(db)
+    return station_index.search(q, limit)
+
+
 # станции по идентификатору
 @router.get("/{station_id}", response_model=StationRelate)
 async def read_station(station_id: int, db: AsyncSession = Depends(get_db)):
@@ -62,6 +88,7 @@ async def create_or_update_station(station: StationCreate, db: AsyncSession = De
         new_station = Station(**station.dict())
         db.add(new_station)
         await db.commit()
+        station_index.invalidate()
         await db.refresh(new_station)
         return StationInDBBase.from_orm(new_station)
     except Exception as e:
@@ -82,6 +109,7 @@ async def delete_station(station_id: int, db: AsyncSession = Depends(get_db)):
 
         await db.delete(station)
         await db.commit()
+        station_index.invalidate()
         return StationInDBBase.from_orm(station)
     except Exception as e:
         print(f"Ошибка удаления станции: {str(e)}")
@@ -104,6 +132,7 @@ async def update_station(station_id: int, station_update: StationUpdate, db: Asy
             setattr(existing_station, key, value)
 
         await db.commit()
+        station_index.invalidate()
         await db.refresh(existing_station)
         return StationInDBBase.from_orm(existing_station)
     except Exception as e:
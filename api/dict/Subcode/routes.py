@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from api.dict.Subcode.schemas import SubcodeInDBBase, SubcodeUpdate, SubcodeCreate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Subcode.models import Subcode
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[SubcodeInDBBase])
-async def read_obj(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_obj(response: Response, skip: int = 0, limit: int = 10,
+                   after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(Subcode).offset(skip).limit(limit))
+        result = await db.execute(paginate(select(Subcode), Subcode.id, skip, limit, after_id))
         subcode = result.scalars().all()
+        set_next_cursor(response, subcode, limit)
         return [SubcodeInDBBase.from_orm(subcode) for subcode in subcode]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read subcodes: {str(e)}")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Territory.schemas import TerritoryInDBBase, TerritoryCreate, TerritoryUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Territory.models import Territory
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -13,13 +14,15 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[TerritoryInDBBase])
-async def read_territorys(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_territorys(response: Response, skip: int = 0, limit: int = 10,
+                          after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Territory)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Territory),
+            Territory.id, skip, limit, after_id
+        ))
         territorys = result.scalars().all()
+        set_next_cursor(response, territorys, limit)
         return [TerritoryInDBBase.from_orm(territory) for territory in territorys]
     except Exception as e:
         print(f"Ошибка чтения Ж/Д территорорий: {str(e)}")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Vat.schemas import VatInDBBase, VatCreate, VatUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Vat.models import Vat
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -14,13 +15,15 @@ router = APIRouter()
 # region РОУТ
 # Список ставок НДС
 @router.get("/", response_model=List[VatInDBBase])
-async def read_vats(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_vats(response: Response, skip: int = 0, limit: int = 10,
+                    after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(Vat)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(Vat),
+            Vat.id, skip, limit, after_id
+        ))
         vats = result.scalars().all()
+        set_next_cursor(response, vats, limit)
         return [VatInDBBase.from_orm(vat) for vat in vats]
     except Exception as e:
         print(f"Ошибка чтения ставок НДС: {str(e)}")
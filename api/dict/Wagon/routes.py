@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -6,8 +6,9 @@ from sqlalchemy.orm import selectinload
 from api.dict.Wagon.schemas import WagonRelate, WagonCreate, WagonUpdate, WagonInDBBase
 from api.dict.WagonType.schemas import WagonTypeInDBBase
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.Wagon.models import Wagon
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -15,14 +16,16 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[WagonRelate])
-async def read_wagons(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_wagons(response: Response, skip: int = 0, limit: int = 10,
+                      after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
+        result = await db.execute(paginate(
             select(Wagon)
-            .options(selectinload(Wagon.wagon_type))
-            .offset(skip).limit(limit)
-        )
+            .options(selectinload(Wagon.wagon_type)),
+            Wagon.id, skip, limit, after_id
+        ))
         wagons = result.scalars().all()
+        set_next_cursor(response, wagons, limit)
 
         for wagon in wagons:
             if wagon.wagon_type:
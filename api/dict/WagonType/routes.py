@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.WagonType.schemas import WagonTypeInDBBase, WagonTypeCreate, WagonTypeUpdate
 from config.db import get_db
+from config.pagination import after_id_param, paginate, set_next_cursor
 from api.dict.WagonType.models import WagonType
-from typing import List
+from typing import List, Optional
 
 
 router = APIRouter()
@@ -13,13 +14,15 @@ router = APIRouter()
 
 # region РОУТ
 @router.get("/", response_model=List[WagonTypeInDBBase])
-async def read_wagon_types(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_wagon_types(response: Response, skip: int = 0, limit: int = 10,
+                           after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(
-            select(WagonType)
-            .offset(skip).limit(limit)
-        )
+        result = await db.execute(paginate(
+            select(WagonType),
+            WagonType.id, skip, limit, after_id
+        ))
         wagon_types = result.scalars().all()
+        set_next_cursor(response, wagon_types, limit)
         return [WagonTypeInDBBase.from_orm(wagon_type) for wagon_type in wagon_types]
     except Exception as e:
         print(f"Ошибка чтения родов ПС: {str(e)}")
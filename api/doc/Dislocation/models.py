@@ -1,14 +1,11 @@
-from sqlalchemy import Column, Integer, DateTime, String, Boolean, Date, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, DateTime, String, Boolean, Date, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from config.db import Base
 from sqlalchemy.sql import func
 
 
-# Класс - Дислокация вагонов и контейнеров
-class Dislocation(Base):
-    __tablename__ = "dislocation"
-
-    id = Column(Integer, primary_key=True, index=True)
+# Реквизиты дислокации, общие для истории и текущего положения
+class DislocationFields:
     date = Column(DateTime, default=func.now())
     loaded = Column(Boolean, default=False)
     nomer_nakladnoi = Column(String(30), default="")
@@ -39,22 +36,52 @@ class Dislocation(Base):
     vagon_comment = Column(String(200), default="")
 
     wagon_id = Column(Integer, ForeignKey('wagons.id'), nullable=True)
-    wagon = relationship("Wagon", back_populates="dislocation_wagon")
-
     container_id = Column(Integer, ForeignKey('containers.id'), nullable=True)
-    container = relationship("Container", back_populates="dislocation_container")
-
     station_otpr_id = Column(Integer, ForeignKey('stations.id'), nullable=True)
-    station_otpr = relationship("Station", back_populates="dislocation_station_otpr", foreign_keys=[station_otpr_id])
-
     station_tek_id = Column(Integer, ForeignKey('stations.id'), nullable=True)
-    station_tek = relationship("Station", back_populates="dislocation_station_tek", foreign_keys=[station_tek_id])
-
     station_nazn_id = Column(Integer, ForeignKey('stations.id'), nullable=True)
-    station_nazn = relationship("Station", back_populates="dislocation_station_nazn", foreign_keys=[station_nazn_id])
-
     etsng_id = Column(Integer, ForeignKey('etsng.id'), nullable=True)
-    etsng = relationship("Etsng", back_populates="dislocation_etsng", foreign_keys=[etsng_id])
-
     prev_etsng_id = Column(Integer, ForeignKey('etsng.id'), nullable=True)
-    prev_etsng = relationship("Etsng", back_populates="dislocation_prev_etsng", foreign_keys=[prev_etsng_id])
+
+
+# Класс - Дислокация вагонов и контейнеров
+# На PostgreSQL таблица секционирована по месяцам поля date (см. миграции и dislocation_partitions),
+# первичный ключ таблицы - (id, date); так же он объявлен и для ORM
+class Dislocation(DislocationFields, Base):
+    __tablename__ = "dislocation"
+    __table_args__ = (
+        Index("ix_dislocation_date", "date"),
+        Index("ix_dislocation_date_oper", "date_oper"),
+        Index("ix_dislocation_wagon_id_date_oper", "wagon_id", "date_oper"),
+        Index("ix_dislocation_container_id_date_oper", "container_id", "date_oper"),
+        Index("ix_dislocation_station_tek_id_date_oper", "station_tek_id", "date_oper"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    __mapper_args__ = {"primary_key": ["id", "date"]}
+
+    wagon = relationship("Wagon", back_populates="dislocation_wagon")
+    container = relationship("Container", back_populates="dislocation_container")
+
+    station_otpr = relationship("Station", back_populates="dislocation_station_otpr", foreign_keys="Dislocation.station_otpr_id")
+    station_tek = relationship("Station", back_populates="dislocation_station_tek", foreign_keys="Dislocation.station_tek_id")
+    station_nazn = relationship("Station", back_populates="dislocation_station_nazn", foreign_keys="Dislocation.station_nazn_id")
+    etsng = relationship("Etsng", back_populates="dislocation_etsng", foreign_keys="Dislocation.etsng_id")
+    prev_etsng = relationship("Etsng", back_populates="dislocation_prev_etsng", foreign_keys="Dislocation.prev_etsng_id")
+
+
+# Класс - Текущее положение вагонов и контейнеров: одна строка на вагон/контейнер,
+# обновляется загрузкой дислокации в той же транзакции, что и история
+class DislocationCurrent(DislocationFields, Base):
+    __tablename__ = "dislocation_current"
+    __table_args__ = (
+        Index("ix_dislocation_current_wagon_id", "wagon_id"),
+        Index("ix_dislocation_current_container_id", "container_id"),
+        Index("ix_dislocation_current_station_tek_id", "station_tek_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    unit_key = Column(String(50), unique=True, nullable=False)
+    # Отпечаток состояния последней загруженной строки (операция, станция, дата и т.д.)
+    fingerprint = Column(String(32), default="")
@@ -1,18 +1,70 @@
+import asyncio
+from datetime import date, datetime, timedelta
 from sqlalchemy import select
 from config.db import get_db
-from fastapi import APIRouter, Depends
+from config.pagination import after_id_param, paginate, set_next_cursor
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from .models import Dislocation
-from .schemas import DislocationBase
+from typing import List, Optional
+from api.imports.dislocation_archive import read_archive
+from .models import Dislocation, DislocationCurrent
+from .schemas import DislocationBase, DislocationCurrentBase
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DislocationBase])
-async def read_dislocation(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
+async def read_dislocation(response: Response, skip: int = 0, limit: int = 10,
+                           after_id: Optional[int] = Depends(after_id_param), db: AsyncSession = Depends(get_db)):
     async with db as session:
         result = await session.execute(
-            select(Dislocation).offset(skip).limit(limit)
+            paginate(select(Dislocation), Dislocation.id, skip, limit, after_id)
         )
         dislocations = result.scalars().all()
+        set_next_cursor(response, dislocations, limit)
         return dislocations
+
+
+# Текущее положение вагонов и контейнеров
+@router.get("/current", response_model=List[DislocationCurrentBase])
+async def read_dislocation_current(response: Response, wagon_id: Optional[int] = None, container_id: Optional[int] = None,
+                                   station_tek_id: Optional[int] = None, skip: int = 0, limit: int = 10,
+                                   after_id: Optional[int] = Depends(after_id_param),
+                                   db: AsyncSession = Depends(get_db)):
+    async with db as session:
+        query = select(DislocationCurrent)
+        if wagon_id is not None:
+            query = query.where(DislocationCurrent.wagon_id == wagon_id)
+        if container_id is not None:
+            query = query.where(DislocationCurrent.container_id == container_id)
+        if station_tek_id is not None:
+            query = query.where(DislocationCurrent.station_tek_id == station_tek_id)
+        result = await session.execute(
+            paginate(query, DislocationCurrent.id, skip, limit, after_id)
+        )
+        current = result.scalars().all()
+        set_next_cursor(response, current, limit)
+        return current
+
+
+# История за период: строки из таблицы и из архива старых периодов
+@router.get("/history", response_model=List[DislocationBase])
+async def read_dislocation_history(date_from: date, date_to: Optional[date] = None, wagon_id: Optional[int] = None,
+                                   container_id: Optional[int] = None, limit: int = 1000,
+                                   db: AsyncSession = Depends(get_db)):
+    date_to = date_to or date.today()
+    async with db as session:
+        query = select(Dislocation).where(
+            Dislocation.date >= datetime.combine(date_from, datetime.min.time()),
+            Dislocation.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()),
+        )
+        if wagon_id is not None:
+            query = query.where(Dislocation.wagon_id == wagon_id)
+        if container_id is not None:
+            query = query.where(Dislocation.container_id == container_id)
+        result = await session.execute(query.order_by(Dislocation.date, Dislocation.id).limit(limit))
+        rows = {row.id: DislocationBase.from_orm(row) for row in result.scalars().all()}
+
+    archived = await asyncio.to_thread(lambda: list(read_archive(date_from, date_to, wagon_id, container_id, limit)))
+    for row in archived:
+        rows.setdefault(row['id'], DislocationBase(**row))
+    return sorted(rows.values(), key=lambda row: (row.date, row.id))[:limit]
@@ -44,3 +44,10 @@ class DislocationBase(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class DislocationCurrentBase(DislocationBase):
+    unit_key: str
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,89 @@
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Размер пачки для IN (...) и пакетной вставки
+CHUNK_SIZE = 1000
+
+
+# Разбиение последовательности на пачки
+def chunked(items, size: int = CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Выборка строк по списку значений ключа пачками: WHERE column IN (...)
+async def select_in(session: AsyncSession, stmt, column, values):
+    rows = []
+    for chunk in chunked(values):
+        result = await session.execute(stmt.where(column.in_(chunk)))
+        rows.extend(result.all())
+    return rows
+
+
+# Значения Column(default=...) для колонок таблицы, которых нет в columns:
+# {колонка: функция без аргументов}. COPY их не применяет, в отличие от INSERT через
+# SQLAlchemy; серверные значения по умолчанию (server_default) COPY применяет сам.
+# SQL-выражение (func.now()) вычисляется один раз на вставку.
+async def column_defaults(conn, table, columns):
+    defaults = {}
+    for column in table.columns:
+        default = column.default
+        if column.name in columns or default is None:
+            continue
+        if default.is_scalar:
+            defaults[column.name] = lambda value=default.arg: value
+        elif default.is_callable:
+            defaults[column.name] = lambda fn=default.arg: fn(None)
+        elif default.is_clause_element:
+            value = await conn.scalar(select(default.arg))
+            defaults[column.name] = lambda value=value: value
+    return defaults
+
+
+# Пакетная вставка строк в таблицу в обход unit of work ORM.
+# На PostgreSQL (asyncpg) - COPY через copy_records_to_table, иначе - executemany пачками.
+async def bulk_insert(session: AsyncSession, table, columns, rows, batch_size: int = CHUNK_SIZE):
+    if not rows:
+        return 0
+    conn = await session.connection()
+    if conn.dialect.name == 'postgresql' and conn.dialect.driver == 'asyncpg':
+        raw = await conn.get_raw_connection()
+        defaults = await column_defaults(conn, table, columns)
+        records = [
+            tuple(row[c] for c in columns) + tuple(default() for default in defaults.values())
+            for row in rows
+        ]
+        await raw.driver_connection.copy_records_to_table(
+            table.name, records=records, columns=list(columns) + list(defaults), schema_name=table.schema
+        )
+    else:
+        for chunk in chunked(rows, batch_size):
+            await conn.execute(insert(table), [{c: row[c] for c in columns} for row in chunk])
+    return len(rows)
+
+
+# Пакетный upsert: INSERT ... ON CONFLICT (index_elements) DO UPDATE (PostgreSQL, SQLite).
+# where(table, excluded) - необязательное условие обновления существующей строки.
+async def bulk_upsert(session: AsyncSession, table, rows, index_elements, update_columns=None,
+                      where=None, index_where=None, batch_size: int = CHUNK_SIZE):
+    if not rows:
+        return 0
+    conn = await session.connection()
+    dialects = {'postgresql': postgresql, 'sqlite': sqlite}
+    if conn.dialect.name not in dialects:
+        raise NotImplementedError(f"Upsert не поддерживается для {conn.dialect.name}")
+
+    stmt = dialects[conn.dialect.name].insert(table)
+    if update_columns is None:
+        update_columns = [c for c in rows[0] if c not in index_elements]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        index_where=index_where,
+        set_={c: stmt.excluded[c] for c in update_columns},
+        where=where(table, stmt.excluded) if where is not None else None,
+    )
+    for chunk in chunked(rows, batch_size):
+        await conn.execute(stmt, chunk)
+    return len(rows)
@@ -1,8 +1,13 @@
-from fastapi import Request
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
+import time
+from sqlalchemy import delete, event, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from api.dict.Bank.models import Bank
 from api.dict.BankAccount.models import BankAccount
 from api.dict.BankAccountOrg.models import BankAccountOrg
@@ -12,337 +17,552 @@ from api.dict.Currency.models import Currency
 from api.dict.Country.models import Country
 from api.dict.Organization.models import Organization
 from api.dict.Vat.models import Vat
+from api.imports.bulk import bulk_upsert, chunked, select_in
+from api.imports.models import ImportWatermark
+from config.db import async_session
 from typing import Optional
 
-
-async def receive_json_1c(request: Request, session: AsyncSession):
-    try:
-        data = await request.json()
-        # Обработка полученного JSON
-        await load_currency(session, data)
-        await load_countries(session, data)
-        await load_vat(session, data)
-        await load_banks(session, data)
-        await load_organizations(session, data)
-        await load_contractors(session, data)
-        await load_bank_accounts_org(session, data)
-        await load_bank_accounts(session, data)
-        await load_contracts(session, data)
-        return {"message": "JSON received successfully", "status": "OK"}
-    except json.JSONDecodeError:
-        return {"error": "Invalid JSON", "status": "ERROR"}
-
-
-async def load_currency(session, data):
-    for currency_data in data.get('Currency', []):
-        guid = currency_data['guid']
-        result = await session.execute(select(Currency).filter_by(guid=guid))
-        existing_currency = result.scalar_one_or_none()
-        if existing_currency:
-            # Обновляем существующий объект
-            for key, value in currency_data.items():
-                setattr(existing_currency, key, value)
-        else:
-            # Создаем новый объект
-            new_currency = Currency(**currency_data)
-            session.add(new_currency)
-    await session.commit()
-
-
-async def load_countries(session, data):
-    for counttry_data in data.get('Country', []):
-        guid = counttry_data['guid']
-        name = counttry_data['name']
-        full_name = counttry_data['full_name']
-        code = counttry_data['code']
-
-        # Проверка существования объекта по guid
-        result = await session.execute(select(Country).filter(Country.guid == guid))
-        country = result.scalars().first()
-
-        if country:
-            # Если объект существует, обновляем его
-            country.name = name
-            country.full_name = full_name
-            country.code = code
-        else:
-            # Если объект не существует, создаем новый
-            new_country = Country(
-                guid=guid,
-                name=name,
-                full_name=full_name,
-                code=code
-            )
-            session.add(new_country)
-    await session.commit()
-
-
-async def load_vat(session, data):
-    for vat_data in data.get('NDS', []):
-        guid = vat_data['guid']
-        result = await session.execute(select(Vat).filter_by(guid=guid))
-        existing_vat = result.scalar_one_or_none()
-        if existing_vat:
-            # Обновляем существующий объект
-            for key, value in vat_data.items():
-                setattr(existing_vat, key, value)
-        else:
-            # Создаем новый объект
-            new_vat = Vat(**vat_data)
-            session.add(new_vat)
-    await session.commit()
-
-
-async def load_banks(session, data):
-    for bank_data in data.get('Bank', []):
-        guid = bank_data['guid']
-        result = await session.execute(select(Bank).filter_by(guid=guid))
-        existing_bank = result.scalar_one_or_none()
-        if existing_bank:
-            # Обновляем существующий объект
-            for key, value in bank_data.items():
-                setattr(existing_bank, key, value)
-        else:
-            # Создаем новый объект
-            new_bank = Bank(**bank_data)
-            session.add(new_bank)
-    await session.commit()
-
-
-async def load_organizations(session, data):
-    for org_data in data.get('Organization', []):
-        guid = org_data['guid']
-        name = org_data['name']
-        full_name = org_data['full_name']
-        bin_iin = org_data['bin']
-        kbe = org_data['kbe']
-        owner_type = org_data['owner_type']
-        enterpreneur = org_data['enterpreneur']
-        legal_address = org_data['legal_address']
-
-        country_code = org_data['country']
-        result_country = await session.execute(select(Country).filter_by(code=country_code))
-        country = result_country.scalar_one_or_none()
-        country_id = country.id if country else None
-
-        result = await session.execute(select(Organization).filter(Organization.guid == guid))
-        org = result.scalars().first()
-        if org:
-            org.name = name
-            org.full_name = full_name
-            org.bin = bin_iin
-            org.kbe = kbe
-            org.country_id = country_id
-            org.owner_type = owner_type
-            org.enterpreneur = enterpreneur
-            org.legal_address = legal_address
+# Размер пачки INSERT ... ON CONFLICT при загрузке из 1С
+IMPORT_1C_BATCH_SIZE = int(os.getenv("IMPORT_1C_BATCH_SIZE", "500"))
+# Каталог временных файлов загрузки из 1С (тела запросов, отложенные разделы)
+IMPORT_1C_SPOOL_DIR = os.getenv("IMPORT_1C_SPOOL_DIR", tempfile.gettempdir())
+# Ошибка любого раздела откатывает всю выгрузку; при 0 откатывается только раздел
+# и ссылающиеся на него разделы, остальное сохраняется
+IMPORT_1C_ATOMIC = os.getenv("IMPORT_1C_ATOMIC", "1") == "1"
+# Сколько пачек независимых разделов подготавливается одновременно
+IMPORT_1C_PREPARE_CONCURRENCY = int(os.getenv("IMPORT_1C_PREPARE_CONCURRENCY", "4"))
+# Условие частичного уникального индекса по guid (ux_<таблица>_guid)
+GUID_INDEX_WHERE = "guid <> ''"
+
+
+# Разделы выгрузки 1С в порядке загрузки, разделы, на которые они ссылаются, и модели
+def loaders_1c():
+    return [
+        ('Currency', load_currency, (), Currency),
+        ('Country', load_countries, (), Country),
+        ('NDS', load_vat, (), Vat),
+        ('Bank', load_banks, (), Bank),
+        ('Organization', load_organizations, ('Country',), Organization),
+        ('Contractor', load_contractors, ('Country',), Contractor),
+        ('BankAccountOrg', load_bank_accounts_org, ('Bank', 'Currency', 'Organization'), BankAccountOrg),
+        ('BankAccount', load_bank_accounts, ('Bank', 'Currency', 'Contractor'), BankAccount),
+        ('Contract', load_contracts, ('Currency', 'Organization', 'Contractor'), Contract),
+    ]
+
+
+# События (раздел, запись) из уже разобранного JSON
+async def iter_data_sections(data: dict):
+    for section, records in data.items():
+        for record in records if isinstance(records, list) else [records]:
+            yield section, record
+
+
+# Загрузка выгрузки 1С из потока событий (раздел, запись) - см. api.imports.streaming.
+# Вся выгрузка пишется в одной транзакции с одним commit в конце, каждый раздел - в своей
+# точке сохранения (SAVEPOINT). Записи раздела обрабатываются пачками по IMPORT_1C_BATCH_SIZE.
+# Разделы без ссылок на другие (валюты, страны, НДС, банки) подготавливаются параллельно
+# в отдельных сессиях, а пишутся по порядку; точка сохранения такого раздела остается
+# открытой до конца раздела, так что и он откатывается целиком. Раздел, пришедший раньше разделов,
+# на которые он ссылается, сбрасывается во временный файл и загружается после них.
+class Import1C:
+    def __init__(self, session: AsyncSession, report: dict, version: Optional[int] = None,
+                 atomic: bool = IMPORT_1C_ATOMIC):
+        self.session = session
+        self.report = report
+        self.version = version
+        self.atomic = atomic
+        self.refs = RefResolver()
+        self.loaders = {section: (loader, set(depends), model) for section, loader, depends, model in loaders_1c()}
+        self.sections = report.setdefault("sections", {})
+        report["unresolved"] = self.refs.unresolved
+        self.done = set()
+        self.failed = set()
+        self.deferred = {}
+        # Подготовка независимых разделов, еще не записанная в базу: [(раздел, задача)]
+        self.pending = []
+        # Независимый раздел, точка сохранения которого открыта, и guid, вставленные разделами
+        self.open_section = None
+        self.inserted = {}
+        self.savepoint = None
+        # Удаляемые записи (tombstones) по разделам: удаляются в конце, в обратном порядке зависимостей
+        self.tombstones = {}
+        self.stale = set()
+
+    async def run(self, events):
+        try:
+            await self.check_watermarks()
+            current, batch = None, []
+            async for section, record in events:
+                if section not in self.loaders or section in self.stale:
+                    continue
+                if section != current:
+                    await self.end_section(current, batch)
+                    current, batch = section, []
+                    await self.begin_section(section)
+                if isinstance(record, dict) and record.get('deleted'):
+                    self.tombstones.setdefault(section, []).append(record['guid'])
+                    continue
+                if section in self.deferred:
+                    self.deferred[section].write(json.dumps(record, ensure_ascii=False) + '\n')
+                    continue
+                batch.append(record)
+                if len(batch) >= IMPORT_1C_BATCH_SIZE:
+                    await self.load(section, batch)
+                    batch = []
+            await self.end_section(current, batch)
+            await self.apply_pending()
+            await self.close_independent()
+            await self.load_deferred()
+            await self.apply_tombstones()
+            await self.save_watermarks()
+            await self.session.commit()
+        except BaseException:
+            await self.cancel_pending()
+            await self.session.rollback()
+            # Откачены все начатые разделы, в т.ч. отложенные; ошибочный остается с ошибкой
+            for section, entry in self.sections.items():
+                if section not in self.stale and entry.get("status") != "error":
+                    entry["status"] = "rolled_back"
+            raise
+        finally:
+            for f in self.deferred.values():
+                f.close()
+        self.report["progress"] = {"section": None, "sections_done": len(self.done), "total": len(self.loaders)}
+        return self.report
+
+    # Версия обмена не выше сохраненной - раздел уже применен и пропускается целиком
+    async def check_watermarks(self):
+        if self.version is None:
+            return
+        for section, watermark in (await get_watermarks(self.session)).items():
+            if section in self.loaders and watermark["version"] >= self.version:
+                self.stale.add(section)
+                self.done.add(section)
+                self.sections[section] = {"status": "stale", "watermark": watermark["version"]}
+        self.report["version"] = self.version
+
+    # Новая версия сохраняется для всех разделов, кроме ошибочных и уже применённых:
+    # дельта версии N содержит все изменения до N, отсутствие раздела - отсутствие изменений
+    async def save_watermarks(self):
+        if self.version is None:
+            return
+        rows = [
+            {"entity": section, "version": self.version, "updated_at": datetime.now(timezone.utc)}
+            for section in self.loaders if section not in self.failed and section not in self.stale
+        ]
+        await bulk_upsert(self.session, ImportWatermark.__table__, rows, ['entity'])
+
+    async def apply_tombstones(self):
+        for section in reversed(list(self.loaders)):
+            guids = self.tombstones.pop(section, None)
+            if not guids or section in self.failed:
+                continue
+            table = self.loaders[section][2].__table__
+            self.savepoint = await self.session.begin_nested()
+            started = time.perf_counter()
+            deleted = 0
+            try:
+                for chunk in chunked(set(guids)):
+                    result = await self.session.execute(delete(table).where(table.c.guid.in_(chunk)))
+                    deleted += result.rowcount
+            except Exception as e:
+                await self.fail(section, e)
+                continue
+            self.add_stats(section, {"deleted": deleted}, time.perf_counter() - started)
+            await self.release(section)
+
+    def independent(self, section):
+        return not self.loaders[section][1]
+
+    async def begin_section(self, section):
+        self.report["progress"] = {"section": section, "sections_done": len(self.done), "total": len(self.loaders)}
+        if self.independent(section):
+            return
+        # Перед разделом со ссылками записываются подготовленные независимые разделы
+        await self.apply_pending()
+        await self.close_independent()
+        if not self.loaders[section][1] <= self.done and section not in self.deferred:
+            self.deferred[section] = tempfile.TemporaryFile('w+', encoding='utf-8', dir=IMPORT_1C_SPOOL_DIR)
+            self.sections[section] = {"status": "deferred", "duration": 0.0}
+        elif section not in self.deferred:
+            self.savepoint = await self.session.begin_nested()
+
+    async def end_section(self, section, batch):
+        if section is None or section in self.deferred:
+            return
+        if batch:
+            await self.load(section, batch)
+        if not self.independent(section):
+            await self.release(section)
+
+    async def load(self, section, batch):
+        if section in self.failed:
+            return
+        if self.independent(section):
+            self.pending.append((section, asyncio.create_task(self.prepare_detached(section, batch))))
+            if len(self.pending) >= IMPORT_1C_PREPARE_CONCURRENCY:
+                await self.apply_pending()
+            return
+        started = time.perf_counter()
+        try:
+            model, changed, stats, _ = await self.loaders[section][0](self.session, batch, self.refs)
+            await apply_batch(self.session, model, changed)
+        except Exception as e:
+            await self.fail(section, e)
+            return
+        self.add_stats(section, stats, time.perf_counter() - started)
+
+    # Подготовка пачки независимого раздела в отдельной сессии (только чтение)
+    async def prepare_detached(self, section, batch):
+        started = time.perf_counter()
+        async with async_session() as session:
+            prepared = await self.loaders[section][0](session, batch, self.refs)
+        return prepared, time.perf_counter() - started
+
+    # Запись подготовленных пачек. Точка сохранения независимого раздела открывается
+    # на его первой пачке и закрывается при переходе к другому разделу (close_independent),
+    # а не в конце вызова: раздел из нескольких вызовов откатывается целиком.
+    async def apply_pending(self):
+        pending, self.pending = self.pending, []
+        try:
+            for i, (section, task) in enumerate(pending):
+                if section != self.open_section:
+                    await self.close_independent()
+                    self.open_section = section
+                    self.savepoint = await self.session.begin_nested()
+                if section in self.failed:
+                    await cancel_tasks([task])
+                    continue
+                try:
+                    (model, changed, stats, new), duration = await task
+                    started = time.perf_counter()
+                    await apply_batch(self.session, model, changed)
+                except Exception as e:
+                    # Остальные пачки раздела не записываются: их подготовка отменяется
+                    await cancel_tasks([other for other_section, other in pending[i + 1:] if other_section == section])
+                    await self.fail(section, e)
+                    continue
+                self.count_inserted(section, stats, new)
+                self.add_stats(section, stats, duration + time.perf_counter() - started)
+        except BaseException:
+            self.pending = pending + self.pending
+            raise
+
+    async def close_independent(self):
+        if self.open_section is not None:
+            section, self.open_section = self.open_section, None
+            await self.release(section)
+
+    # Пачки раздела подготавливаются параллельно, до записи предыдущих: запись, которую
+    # уже вставила более ранняя пачка, считается обновленной, а не вставленной повторно
+    def count_inserted(self, section, stats, new):
+        inserted = self.inserted.setdefault(section, set())
+        repeated = sum(1 for guid in new if guid in inserted)
+        inserted.update(new)
+        stats["inserted"] -= repeated
+        stats["updated"] += repeated
+
+    async def cancel_pending(self):
+        pending, self.pending = self.pending, []
+        await cancel_tasks([task for _, task in pending])
+
+    # Отложенные разделы - в порядке зависимостей
+    async def load_deferred(self):
+        for section in self.loaders:
+            if section not in self.deferred:
+                continue
+            f = self.deferred.pop(section)
+            with f:
+                if self.loaders[section][1] & self.failed:
+                    self.failed.add(section)
+                else:
+                    self.savepoint = await self.session.begin_nested()
+                f.seek(0)
+                batch = []
+                for line in f:
+                    batch.append(json.loads(line))
+                    if len(batch) >= IMPORT_1C_BATCH_SIZE:
+                        await self.load(section, batch)
+                        batch = []
+                if batch:
+                    await self.load(section, batch)
+            await self.release(section)
+
+    def add_stats(self, section, stats, duration):
+        total = self.sections.setdefault(section, {"status": "running", "duration": 0.0})
+        total["status"] = "running"
+        for key, value in stats.items():
+            total[key] = total.get(key, 0) + value
+        total["duration"] = round(total["duration"] + duration, 3)
+
+    # Ошибка раздела: его изменения откатываются до точки сохранения. В атомарном режиме
+    # откатывается вся выгрузка, иначе разделы, ссылающиеся на него, пропускаются.
+    async def fail(self, section, error):
+        if self.savepoint is not None and self.savepoint.is_active:
+            await self.savepoint.rollback()
+        self.savepoint = None
+        self.failed.add(section)
+        # Счетчики раздела обнуляются: его записи откачены
+        duration = self.sections.get(section, {}).get("duration", 0.0)
+        self.sections[section] = {"status": "error", "error": str(error), "duration": duration}
+        if self.atomic:
+            raise error
+        for dependent, (_, depends, _) in self.loaders.items():
+            if section in depends:
+                self.failed.add(dependent)
+
+    async def release(self, section):
+        if self.savepoint is not None and self.savepoint.is_active:
+            await self.savepoint.commit()
+        self.savepoint = None
+        if section in self.failed:
+            # Раздел пропущен из-за ошибки в разделе, на который он ссылается
+            entry = self.sections.setdefault(section, {"duration": 0.0})
+            if entry.get("status") != "error":
+                entry["status"] = "skipped"
+            return
+        self.done.add(section)
+        self.sections.setdefault(section, {"duration": 0.0})["status"] = "done"
+
+
+async def cancel_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def import_1c(session: AsyncSession, events, report: dict, version: Optional[int] = None):
+    return await Import1C(session, report, version).run(events)
+
+
+# Версии последних примененных обменов по разделам (GET /1c/watermark)
+async def get_watermarks(session: AsyncSession):
+    result = await session.execute(select(ImportWatermark))
+    return {
+        watermark.entity: {"version": watermark.version, "updated_at": watermark.updated_at}
+        for watermark in result.scalars().all()
+    }
+
+
+# Записи с одинаковым guid внутри выгрузки: побеждает последняя; записи без guid пропускаются
+def unique_by_guid(rows):
+    return list({row['guid']: row for row in rows if row.get('guid')}.values())
+
+
+# Хеш содержимого записи выгрузки (после сопоставления ссылок) - хранится в source_hash
+def source_hash(row):
+    payload = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+# Подготовка пачки раздела: хеши записей сравниваются с сохраненными, записи с совпавшим
+# хешем отбрасываются. Возвращает модель, строки для записи, счетчики пачки и guid новых записей.
+async def prepare_batch(session, model, rows, skipped: int = 0):
+    rows = unique_by_guid(rows)
+    table = model.__table__
+    stored = dict(await select_in(
+        session, select(table.c.guid, table.c.source_hash), table.c.guid, [row['guid'] for row in rows]
+    ))
+    stats = {"records": len(rows) + skipped, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": skipped}
+    changed, new = [], []
+    for row in rows:
+        row['source_hash'] = source_hash(row)
+        if row['guid'] not in stored:
+            stats["inserted"] += 1
+            new.append(row['guid'])
+        elif stored[row['guid']] == row['source_hash']:
+            stats["unchanged"] += 1
+            continue
         else:
-            # Создаем новый объект
-            new_org = Organization(
-                guid=guid,
-                name=name,
-                full_name=full_name,
-                bin=bin_iin,
-                kbe=kbe,
-                country_id=country_id,
-                owner_type=owner_type,
-                enterpreneur=enterpreneur,
-                legal_address=legal_address
-            )
-            session.add(new_org)
-    await session.commit()
-
-
-async def load_contractors(session, data):
+            stats["updated"] += 1
+        changed.append(row)
+    stats["changed"] = len(changed)
+    return model, changed, stats, new
+
+
+# Запись подготовленной пачки: INSERT ... ON CONFLICT (guid) DO UPDATE пачками по IMPORT_1C_BATCH_SIZE.
+# Ключ - частичный уникальный индекс по guid (guid <> ''). Строки с разным набором полей
+# пишутся отдельными запросами: обновляются только поля, переданные в строке.
+async def apply_batch(session, model, changed):
+    groups = {}
+    for row in changed:
+        groups.setdefault(tuple(row), []).append(row)
+    for rows in groups.values():
+        await bulk_upsert(session, model.__table__, rows, ['guid'],
+                          index_where=text(GUID_INDEX_WHERE), batch_size=IMPORT_1C_BATCH_SIZE)
+
+
+# Правка записи через API сбрасывает source_hash, чтобы следующий обмен с 1С ее перезаписал
+def reset_source_hash(mapper, connection, target):
+    if not inspect(target).attrs.source_hash.history.has_changes():
+        target.source_hash = ""
+
+
+for synced_model in (Currency, Country, Vat, Bank, Organization, Contractor, BankAccountOrg, BankAccount, Contract):
+    event.listen(synced_model, 'before_update', reset_source_hash)
+
+
+async def load_currency(session, records, refs):
+    rows = [{
+        'guid': currency_data['guid'],
+        'name': currency_data['name'],
+        'code': currency_data['code'],
+        # Необязательные поля: отсутствующие в выгрузке не затирают сохраненные значения
+        **{key: currency_data[key] for key in ('copybook_parameters_ru', 'copybook_parameters_en')
+           if key in currency_data},
+    } for currency_data in records]
+    return await prepare_batch(session, Currency, rows)
+
+
+async def load_countries(session, records, refs):
+    rows = [{
+        'guid': country_data['guid'],
+        'name': country_data['name'],
+        'full_name': country_data['full_name'],
+        'code': country_data['code'],
+    } for country_data in records]
+    return await prepare_batch(session, Country, rows)
+
+
+async def load_vat(session, records, refs):
+    rows = [{
+        'guid': vat_data['guid'],
+        'name': vat_data['name'],
+        **{key: vat_data[key] for key in ('rate',) if key in vat_data},
+    } for vat_data in records]
+    return await prepare_batch(session, Vat, rows)
+
+
+async def load_banks(session, records, refs):
+    rows = [{
+        'guid': bank_data['guid'],
+        'name': bank_data['name'],
+        # Необязательные поля: отсутствующие в выгрузке не затирают сохраненные значения
+        **{key: bank_data[key] for key in ('bik', 'city') if key in bank_data},
+    } for bank_data in records]
+    return await prepare_batch(session, Bank, rows)
+
+
+async def load_organizations(session, organizations, refs):
+    await refs.load(session, Country, 'code', [org_data['country'] for org_data in organizations])
+    rows = []
+    for org_data in organizations:
+        rows.append({
+            'guid': org_data['guid'],
+            'name': org_data['name'],
+            'full_name': org_data['full_name'],
+            'bin': org_data['bin'],
+            'kbe': org_data['kbe'],
+            'country_id': refs.resolve('Organization', org_data, 'country', Country, 'code'),
+            'owner_type': org_data['owner_type'],
+            'enterpreneur': org_data['enterpreneur'],
+            'legal_address': org_data['legal_address'],
+        })
+    return await prepare_batch(session, Organization, rows)
+
+
+async def load_contractors(session, contractors, refs):
     # Загружаем контрагентов
-    for contractor_data in data.get('Contractor', []):
-        name = contractor_data['name']
-        guid = contractor_data['guid']
-        full_name = contractor_data['full_name']
-        bin_iin = contractor_data['bin']
-        kbe = contractor_data['kbe']
-        owner_type = contractor_data['owner_type']
-        enterpreneur = contractor_data['enterpreneur']
-        legal_address = contractor_data['legal_address']
-        comment = contractor_data['comment']
-        document = contractor_data['document']
-
-        country_guid = contractor_data['country']
-        result_country = await session.execute(select(Country).filter_by(guid=country_guid))
-        country = result_country.scalar_one_or_none()
-        country_id = country.id if country else None
-
-        result = await session.execute(select(Contractor).filter(Contractor.guid == guid))
-        cont = result.scalars().first()
-        if cont:
-            cont.name = name
-            cont.full_name = full_name
-            cont.bin = bin_iin
-            cont.kbe = kbe
-            cont.country_id = country_id
-            cont.owner_type = owner_type
-            cont.enterpreneur = enterpreneur
-            cont.comment = comment
-            cont.document = document
-            cont.legal_address = legal_address
-        else:
-            # Создаем новый объект
-            new_contractor = Contractor(
-                guid=guid,
-                name=name,
-                full_name=full_name,
-                bin=bin_iin,
-                kbe=kbe,
-                country_id=country_id,
-                owner_type=owner_type,
-                enterpreneur=enterpreneur,
-                document=document,
-                comment=comment,
-                legal_address=legal_address
-            )
-            session.add(new_contractor)
-    await session.commit()
-
-
-async def load_bank_accounts_org(session, data):
+    await refs.load(session, Country, 'guid', [contractor_data['country'] for contractor_data in contractors])
+    rows = []
+    for contractor_data in contractors:
+        rows.append({
+            'guid': contractor_data['guid'],
+            'name': contractor_data['name'],
+            'full_name': contractor_data['full_name'],
+            'bin': contractor_data['bin'],
+            'kbe': contractor_data['kbe'],
+            'country_id': refs.resolve('Contractor', contractor_data, 'country', Country),
+            'owner_type': contractor_data['owner_type'],
+            'enterpreneur': contractor_data['enterpreneur'],
+            'legal_address': contractor_data['legal_address'],
+            'comment': contractor_data['comment'],
+            'document': contractor_data['document'],
+        })
+    return await prepare_batch(session, Contractor, rows)
+
+
+async def load_bank_accounts_org(session, accounts, refs):
     # Загружаем банковские счета организации
-    for acc_data in data.get('BankAccountOrg', []):
-        name = acc_data['name']
-        guid = acc_data['guid']
-        number = acc_data['number']
-        bank = acc_data['bank']
-        owner = acc_data['owner']
-        currency = acc_data['currency']
-
-        result_bank = await session.execute(select(Bank).filter_by(guid=bank))
-        class_bank = result_bank.scalar_one_or_none()
-        bank_id = class_bank.id if class_bank else None
-
-        result_currency = await session.execute(select(Currency).filter_by(guid=currency))
-        class_currency = result_currency.scalar_one_or_none()
-        currency_id = class_currency.id if class_currency else None
-
-        result_owner = await session.execute(select(Organization).filter_by(guid=owner))
-        class_org = result_owner.scalar_one_or_none()
-        owner_id = class_org.id if class_org else None
-
-        result = await session.execute(select(BankAccountOrg).filter(BankAccountOrg.guid == guid))
-        acc = result.scalars().first()
-        if acc:
-            acc.name = name
-            acc.number = number
-            acc.bank_id = bank_id
-            acc.currency_id = currency_id
-            acc.owner_id = owner_id
-        else:
-            # Создаем новый объект
-            new_acc = BankAccountOrg(
-                guid=guid,
-                name=name,
-                number=number,
-                bank_id=bank_id,
-                currency_id=currency_id,
-                owner_id=owner_id
-            )
-            session.add(new_acc)
-    await session.commit()
+    return await load_accounts(session, refs, 'BankAccountOrg', BankAccountOrg, Organization, accounts)
 
 
-async def load_bank_accounts(session, data):
+async def load_bank_accounts(session, accounts, refs):
     # Загружаем банковские счета контрагентов
-    for acc_data in data.get('BankAccount', []):
-        name = acc_data['name']
-        guid = acc_data['guid']
-        number = acc_data['number']
-        bank = acc_data['bank']
-        owner = acc_data['owner']
-        currency = acc_data['currency']
-
-        result_bank = await session.execute(select(Bank).filter_by(guid=bank))
-        class_bank = result_bank.scalar_one_or_none()
-        bank_id = class_bank.id if class_bank else None
-
-        result_currency = await session.execute(select(Currency).filter_by(guid=currency))
-        class_currency = result_currency.scalar_one_or_none()
-        currency_id = class_currency.id if class_currency else None
-
-        result_owner = await session.execute(select(Contractor).filter_by(guid=owner))
-        class_org = result_owner.scalar_one_or_none()
-        owner_id = class_org.id if class_org else None
-
-        result = await session.execute(select(BankAccount).filter(BankAccount.guid == guid))
-        acc = result.scalars().first()
-        if acc:
-            acc.name = name
-            acc.number = number
-            acc.bank_id = bank_id
-            acc.currency_id = currency_id
-            acc.owner_id = owner_id
-        else:
-            # Создаем новый объект
-            new_acc = BankAccount(
-                guid=guid,
-                name=name,
-                number=number,
-                bank_id=bank_id,
-                currency_id=currency_id,
-                owner_id=owner_id
-            )
-            session.add(new_acc)
-    await session.commit()
-
-
-async def load_contracts (session, data):
+    return await load_accounts(session, refs, 'BankAccount', BankAccount, Contractor, accounts)
+
+
+# Счета организаций и контрагентов отличаются только владельцем
+async def load_accounts(session, refs, section, model, owner_model, accounts):
+    await refs.load(session, Bank, 'guid', [acc_data['bank'] for acc_data in accounts])
+    await refs.load(session, Currency, 'guid', [acc_data['currency'] for acc_data in accounts])
+    await refs.load(session, owner_model, 'guid', [acc_data['owner'] for acc_data in accounts])
+    rows = []
+    for acc_data in accounts:
+        row = {
+            'guid': acc_data['guid'],
+            'name': acc_data['name'],
+            'number': acc_data['number'],
+            'bank_id': refs.resolve(section, acc_data, 'bank', Bank),
+            'currency_id': refs.resolve(section, acc_data, 'currency', Currency),
+            'owner_id': refs.resolve(section, acc_data, 'owner', owner_model),
+        }
+        # Ссылки счета обязательны: без них запись не загружается
+        if None not in (row['bank_id'], row['currency_id'], row['owner_id']):
+            rows.append(row)
+    return await prepare_batch(session, model, rows, skipped=len(accounts) - len(rows))
+
+
+async def load_contracts(session, contracts, refs):
     # Загружаем договоры
-    for contract_data in data.get('Contract', []):
-        name = contract_data['name']
-        guid = contract_data['guid']
-        number = contract_data['number']
+    await refs.load(session, Currency, 'guid', [contract_data['currency'] for contract_data in contracts])
+    await refs.load(session, Organization, 'guid', [contract_data['organization'] for contract_data in contracts])
+    await refs.load(session, Contractor, 'guid', [contract_data['contractor'] for contract_data in contracts])
+    rows = []
+    for contract_data in contracts:
         from_date = contract_data['from_date']
         to_date = contract_data['to_date']
-        organization = contract_data['organization']
-        contractor = contract_data['contractor']
-        currency = contract_data['currency']
-
-        from_date_obj = parse_date(from_date) if from_date else None
-        to_date_obj = parse_date(to_date) if to_date else None
-
-        result_currency = await session.execute(select(Currency).filter_by(guid=currency))
-        class_currency = result_currency.scalar_one_or_none()
-        currency_id = class_currency.id if class_currency else None
-
-        result_org = await session.execute(select(Organization).filter_by(guid=organization))
-        class_organization = result_org.scalar_one_or_none()
-        organization_id = class_organization.id if class_organization else None
-
-        result_owner = await session.execute(select(Contractor).filter_by(guid=contractor))
-        class_contractor = result_owner.scalar_one_or_none()
-        contractor_id = class_contractor.id if class_contractor else None
-
-        result = await session.execute(select(Contract).filter(Contract.guid == guid))
-        contract = result.scalars().first()
-        if contract:
-            contract.name = name
-            contract.number = number
-            contract.from_date = from_date_obj
-            contract.to_date = to_date_obj
-            contract.organization_id = organization_id
-            contract.currency_id = currency_id
-            contract.contractor_id = contractor_id
-        else:
-            # Создаем новый объект
-            new_contract = Contract(
-                guid=guid,
-                name=name,
-                number=number,
-                from_date=from_date_obj,
-                to_date=to_date_obj,
-                organization_id=organization_id,
-                currency_id=currency_id,
-                contractor_id=contractor_id
+        row = {
+            'guid': contract_data['guid'],
+            'name': contract_data['name'],
+            'number': contract_data['number'],
+            'from_date': parse_date(from_date) if from_date else None,
+            'to_date': parse_date(to_date) if to_date else None,
+            'organization_id': refs.resolve('Contract', contract_data, 'organization', Organization),
+            'currency_id': refs.resolve('Contract', contract_data, 'currency', Currency),
+            'contractor_id': refs.resolve('Contract', contract_data, 'contractor', Contractor),
+        }
+        # Ссылки договора обязательны: без них запись не загружается
+        if None not in (row['organization_id'], row['currency_id'], row['contractor_id']):
+            rows.append(row)
+    return await prepare_batch(session, Contract, rows, skipped=len(contracts) - len(rows))
+
+
+# Ссылки выгрузки 1С на другие справочники (guid или код) -> id в базе.
+# Все значения ключа по таблице выбираются одним запросом WHERE key IN (...),
+# дальше сопоставление идет по словарю. Ненайденные ссылки собираются для ответа.
+class RefResolver:
+    def __init__(self):
+        self.maps = {}
+        self.unresolved = {}
+
+    async def load(self, session, model, key, values):
+        cache = self.maps.setdefault((model, key), {})
+        missing = {value for value in values if value and value not in cache}
+        if not missing:
+            return
+        column = getattr(model, key)
+        rows = await select_in(session, select(column, model.id), column, missing)
+        cache.update({value: id for value, id in rows})
+
+    def resolve(self, section, record, field, model, key='guid'):
+        value = record[field]
+        id = self.maps.get((model, key), {}).get(value) if value else None
+        if id is None and value:
+            self.unresolved.setdefault(section, []).append(
+                {"guid": record.get('guid'), "field": field, "value": value}
             )
-            session.add(new_contract)
-    await session.commit()
+        return id
 
 
 def parse_date(date_str: str) -> Optional[date]:
@@ -0,0 +1,285 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import delete, update
+from sqlalchemy.future import select
+from api.imports.data1c import import_1c, iter_data_sections, IMPORT_1C_SPOOL_DIR
+from api.imports.decoding import DECODE_ERRORS, body_format, check_supported, content_encoding, decode_payload, decoded_sections
+from api.imports.models import ImportJob
+from config.db import async_session
+
+logger = logging.getLogger(__name__)
+
+# Число хранимых отчетов о заданиях
+IMPORT_1C_JOBS_KEEP = int(os.getenv("IMPORT_1C_JOBS_KEEP", "50"))
+# Потоковый разбор тела запроса (память - на пачку записей, а не на всю выгрузку)
+IMPORT_1C_STREAM = os.getenv("IMPORT_1C_STREAM", "1") == "1"
+# Как часто (сек) ход выполняемого задания сохраняется в БД
+IMPORT_1C_JOBS_SAVE_SECONDS = float(os.getenv("IMPORT_1C_JOBS_SAVE_SECONDS", "5"))
+SPOOL_CHUNK_SIZE = 1 << 20
+FINISHED = ("success", "error")
+
+
+# Ошибка распаковки или разбора тела запроса (а не загрузки данных)
+class BodyDecodeError(Exception):
+    pass
+
+
+def read_payload(path, encoding, fmt):
+    with open(path, 'rb') as f:
+        return decode_payload(f.read(), encoding, fmt)
+
+
+async def read_chunks(path):
+    with open(path, 'rb') as f:
+        while chunk := await asyncio.to_thread(f.read, SPOOL_CHUNK_SIZE):
+            yield chunk
+
+
+def decode_error(job, error: Exception):
+    if isinstance(error, json.JSONDecodeError):
+        return BodyDecodeError(f"Invalid JSON: {error}")
+    return BodyDecodeError(f"Invalid body ({job['encoding']}, {job['format']}): {error}")
+
+
+# События (раздел, запись) из сохраненного тела запроса (сжатие и формат - по заголовкам).
+# Ошибки разбора перехватываются только здесь: ValueError из загрузчиков - ошибка данных
+async def spool_sections(job):
+    if IMPORT_1C_STREAM:
+        events = decoded_sections(read_chunks(job["path"]), job["encoding"], job["format"])
+        try:
+            while True:
+                try:
+                    event = await anext(events)
+                except StopAsyncIteration:
+                    return
+                except DECODE_ERRORS as e:
+                    raise decode_error(job, e) from e
+                yield event
+        finally:
+            await events.aclose()
+    else:
+        try:
+            data = await asyncio.to_thread(read_payload, job["path"], job["encoding"], job["format"])
+        except DECODE_ERRORS as e:
+            raise decode_error(job, e) from e
+        async for event in iter_data_sections(data):
+            yield event
+
+
+# Файл тела запроса задания; в имени - pid процесса, владеющего очередью
+def spool_path(job_id: str):
+    return os.path.join(IMPORT_1C_SPOOL_DIR, f"1c_{os.getpid()}_{job_id}.body")
+
+
+def process_alive(pid: int):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Владелец заданий, принятых этим процессом
+def job_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Удаление тел заданий, оставшихся от остановленных процессов
+def clean_spool():
+    removed = 0
+    for path in glob.glob(os.path.join(IMPORT_1C_SPOOL_DIR, "1c_*.body")):
+        owner = os.path.basename(path).split("_")[1]
+        if owner.isdigit() and int(owner) != os.getpid() and process_alive(int(owner)):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            logger.warning(f"Не удалось удалить {path}")
+    return removed
+
+
+# Фоновые задания загрузки из 1С.
+# POST /1c только сохраняет тело запроса во временный файл и ставит задание в очередь;
+# задания выполняются одной задачей процесса по очереди, отчет доступен по /1c/jobs/{id}.
+# Состояние и отчет задания хранятся в таблице import_jobs (ход выполняемого задания
+# сохраняется раз в IMPORT_1C_JOBS_SAVE_SECONDS), поэтому отчет доступен из любого
+# процесса; тело запроса и очередь - только у принявшего процесса. Незавершенные
+# задания остановленных процессов этого хоста помечаются при старте ошибкой
+# (1С повторяет выгрузку), их файлы удаляются.
+class Import1CJobs:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        # Задания этого процесса в очереди и в работе (с путем к телу запроса)
+        # и отчеты, которые не удалось сохранить в БД
+        self.jobs = {}
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            removed = clean_spool()
+            if removed:
+                logger.info(f"Удалено тел заданий загрузки из 1С прошлого запуска: {removed}")
+            self.task = asyncio.create_task(self.loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, request: Request, version: Optional[int] = None):
+        encoding, fmt = content_encoding(request.headers), body_format(request.headers)
+        check_supported(encoding, fmt)
+        job_id = uuid.uuid4().hex
+        path = spool_path(job_id)
+        size = 0
+        # Запись в файл - в потоке, чтобы не блокировать цикл событий;
+        # при обрыве соединения клиентом или ошибке БД недописанный файл удаляется
+        try:
+            with open(path, 'wb') as f:
+                async for chunk in request.stream():
+                    await asyncio.to_thread(f.write, chunk)
+                    size += len(chunk)
+            job = {
+                "id": job_id,
+                "status": "queued",
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "size": size,
+                "version": version,
+                "encoding": encoding,
+                "format": fmt,
+                "path": path,
+            }
+            async with async_session() as session:
+                session.add(ImportJob(id=job_id, status="queued", owner=job_owner(), report=self.view(job)))
+                await session.commit()
+        except BaseException:
+            os.remove(path)
+            raise
+        self.jobs[job_id] = job
+        self.queue.put_nowait(job_id)
+        return {"job_id": job_id, "status": "queued", "position": self.queue.qsize()}
+
+    @staticmethod
+    def view(job):
+        return {key: value for key, value in job.items() if key != "path"}
+
+    async def save(self, job):
+        async with async_session() as session:
+            await session.execute(
+                update(ImportJob).where(ImportJob.id == job["id"])
+                .values(status=job["status"], report=json.loads(json.dumps(self.view(job), default=str)))
+            )
+            await session.commit()
+
+    # Ход выполняемого задания - в БД для запросов к другим процессам
+    async def save_progress(self, job):
+        while True:
+            await asyncio.sleep(IMPORT_1C_JOBS_SAVE_SECONDS)
+            try:
+                await self.save(job)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить ход загрузки из 1С {job['id']}: {e}")
+
+    # Незавершенные задания остановленных процессов этого хоста; задания других
+    # хостов не трогаются: их процессы отсюда не проверить
+    async def recover(self):
+        host = socket.gethostname()
+        async with async_session() as session:
+            result = await session.execute(
+                select(ImportJob.id, ImportJob.owner, ImportJob.report)
+                .filter(ImportJob.status.not_in(FINISHED), ImportJob.owner.like(f"{host}:%"))
+            )
+            interrupted = 0
+            for job_id, owner, report in result.all():
+                pid = owner.rsplit(":", 1)[1]
+                if pid.isdigit() and int(pid) != os.getpid() and process_alive(int(pid)):
+                    continue
+                report = dict(report, status="error", error="Interrupted by application restart")
+                await session.execute(
+                    update(ImportJob).where(ImportJob.id == job_id).values(status="error", report=report)
+                )
+                interrupted += 1
+            await session.commit()
+        if interrupted:
+            logger.info(f"Прерванных заданий загрузки из 1С прошлого запуска: {interrupted}")
+
+    # Отчеты о старых завершенных заданиях удаляются
+    async def prune(self):
+        async with async_session() as session:
+            keep = (
+                select(ImportJob.id).filter(ImportJob.status.in_(FINISHED))
+                .order_by(ImportJob.created_at.desc()).limit(IMPORT_1C_JOBS_KEEP)
+            )
+            await session.execute(
+                delete(ImportJob).where(ImportJob.status.in_(FINISHED), ImportJob.id.not_in(keep))
+            )
+            await session.commit()
+
+    async def loop(self):
+        try:
+            await self.recover()
+        except Exception:
+            logger.exception("Не удалось проверить задания загрузки из 1С прошлого запуска")
+        while True:
+            job_id = await self.queue.get()
+            job = await self.run(self.jobs[job_id])
+            try:
+                await self.save(job)
+                await self.prune()
+                del self.jobs[job_id]
+            except Exception:
+                # Отчет остается в памяти этого процесса (не больше IMPORT_1C_JOBS_KEEP)
+                logger.exception(f"Не удалось сохранить отчет загрузки из 1С {job_id}")
+                finished = [key for key, item in self.jobs.items() if item["status"] in FINISHED]
+                for key in finished[:max(len(finished) - IMPORT_1C_JOBS_KEEP, 0)]:
+                    del self.jobs[key]
+
+    async def run(self, job):
+        started = time.perf_counter()
+        job.update(status="running", started_at=datetime.now().isoformat(timespec="seconds"))
+        saver = asyncio.create_task(self.save_progress(job))
+        try:
+            await self.save(job)
+            async with async_session() as session:
+                await import_1c(session, spool_sections(job), job, job["version"])
+            job["status"] = "success"
+        except BodyDecodeError as e:
+            job.update(status="error", error=str(e))
+        except Exception as e:
+            logger.exception("Ошибка загрузки из 1С")
+            job.update(status="error", error=str(e))
+        finally:
+            saver.cancel()
+            os.remove(job.pop("path"))
+        job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        job["duration"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Загрузка из 1С {job['id']}: {job['status']}")
+        return job
+
+    # Задание этого процесса - из памяти (актуальный ход), остальные - из БД
+    async def get(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return self.view(job)
+        async with async_session() as session:
+            result = await session.execute(select(ImportJob.report).filter(ImportJob.id == job_id))
+            return result.scalar()
+
+
+import_1c_jobs = Import1CJobs()
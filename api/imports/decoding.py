@@ -0,0 +1,104 @@
+import asyncio
+import json
+import zlib
+from fastapi import HTTPException, Request
+from api.imports.streaming import JsonSectionParser, MsgpackSectionParser, aiter_sections, msgpack
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Декодирование тел запросов импорта: сжатие (Content-Encoding: gzip, deflate, br)
+# снимается потоково, формат тела (Content-Type) - JSON или MessagePack.
+# brotli и msgpack - необязательные пакеты: без них br и MessagePack отклоняются с 415.
+
+ENCODINGS = ('identity', 'gzip', 'x-gzip', 'deflate', 'br')
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+# Ошибки поврежденного тела: JSON и MessagePack - ValueError, сжатие - zlib/brotli
+DECODE_ERRORS = (ValueError, zlib.error) + ((brotli.error,) if brotli is not None else ())
+
+
+def content_encoding(headers) -> str:
+    return (headers.get('content-encoding') or 'identity').strip().lower()
+
+
+def body_format(headers) -> str:
+    content_type = (headers.get('content-type') or '').split(';')[0].strip().lower()
+    return 'msgpack' if content_type in MSGPACK_TYPES else 'json'
+
+
+# Проверка до приема тела: неподдерживаемое сжатие или формат - 415
+def check_supported(encoding: str, fmt: str):
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=415, detail=f"Неподдерживаемый Content-Encoding: {encoding}")
+    if encoding == 'br' and brotli is None:
+        raise HTTPException(status_code=415, detail="Content-Encoding br недоступен: не установлен пакет brotli")
+    if fmt == 'msgpack' and msgpack is None:
+        raise HTTPException(status_code=415, detail="MessagePack недоступен: не установлен пакет msgpack")
+
+
+# Потоковая распаковка порций тела
+async def decompress(chunks, encoding: str):
+    if encoding == 'identity':
+        async for chunk in chunks:
+            yield chunk
+    elif encoding == 'br':
+        decompressor = brotli.Decompressor()
+        async for chunk in chunks:
+            data = decompressor.process(chunk)
+            if data:
+                yield data
+    else:
+        # gzip и zlib (deflate) по заголовку; gzip из нескольких членов - подряд
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        async for chunk in chunks:
+            while chunk:
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+                chunk = b''
+                if decompressor.eof:
+                    chunk = decompressor.unused_data
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+# События (раздел, запись) из потока порций тела - см. api.imports.streaming
+def decoded_sections(chunks, encoding: str, fmt: str):
+    parser_class = MsgpackSectionParser if fmt == 'msgpack' else JsonSectionParser
+    return aiter_sections(decompress(chunks, encoding), parser_class)
+
+
+def decompress_bytes(data: bytes, encoding: str) -> bytes:
+    if encoding == 'identity':
+        return data
+    if encoding == 'br':
+        return brotli.decompress(data)
+    parts = []
+    while data:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        parts.append(decompressor.decompress(data))
+        parts.append(decompressor.flush())
+        data = decompressor.unused_data if decompressor.eof else b''
+    return b''.join(parts)
+
+
+# Целиком разобранное тело (для небольших выгрузок)
+def decode_payload(data: bytes, encoding: str, fmt: str):
+    raw = decompress_bytes(data, encoding)
+    if fmt == 'msgpack':
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+# Тело запроса с учетом Content-Encoding и Content-Type; None - тело пустое
+async def read_body(request: Request):
+    encoding, fmt = content_encoding(request.headers), body_format(request.headers)
+    check_supported(encoding, fmt)
+    data = await request.body()
+    if not data:
+        return None
+    return await asyncio.to_thread(decode_payload, data, encoding, fmt)
@@ -1,7 +1,10 @@
-from fastapi import Request
+import asyncio
 import json
-from sqlalchemy.ext.asyncio import AsyncSession
 import os
+from datetime import datetime, timezone
+from fastapi import Request
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from api.dict.Etsng.models import Etsng
@@ -9,146 +12,128 @@ from api.dict.Gng.models import Gng
 from api.dict.Station.models import Station
 from api.dict.Territory.models import Territory
 from api.dict.WagonType.models import WagonType
+from api.imports.bulk import bulk_insert, bulk_upsert
+from api.imports.decoding import DECODE_ERRORS, read_body
+from api.imports.dicts_rw.snapshot import SECTIONS, compile_sections, load_snapshot
+from api.imports.models import ImportChecksum
+from config.search import etsng_index, gng_index, station_index
 
+# Справочники РЖД загружаются из снимка (см. snapshot.py). Раздел, контрольная сумма
+# которого совпадает с последней примененной, пропускается целиком; иначе в базу
+# пишутся только новые и изменившиеся строки (сравнение по коду).
 
+# Размер пачки вставки новых строк (executemany; на PostgreSQL - COPY одним вызовом)
+RW_BATCH_SIZE = int(os.getenv("RW_BATCH_SIZE", "5000"))
+
+
+# Тело запроса необязательно: JSON или MessagePack (Content-Type), в т.ч. сжатое gzip/br (Content-Encoding).
+# Разделы тела (territories, stations, wagon_types, etsng, gng) заменяют разделы снимка.
 async def load_rw_json(request: Request, session: AsyncSession):
     try:
-        await load_territories(session)
-        await load_stations(session)
-        await load_wagon_types(session)
-        await load_etsn(session)
-        await load_gng(session)
-
-        return {"status": "SUCCESS"}
+        body = await read_body(request) or {}
+        if not isinstance(body, dict):
+            return {"error": "Invalid body", "status": "ERROR"}
+        sections = dict(await asyncio.to_thread(load_snapshot))
+        overrides = {section: body[section] for section in SECTIONS if body.get(section)}
+        if overrides:
+            sections.update(await asyncio.to_thread(compile_sections, overrides))
     except json.JSONDecodeError:
         return {"error": "Invalid JSON", "status": "ERROR"}
+    except DECODE_ERRORS:
+        return {"error": "Invalid body", "status": "ERROR"}
+
+    applied = await get_checksums(session)
+    report = {}
+    for section, loader in RW_LOADERS.items():
+        content = sections[section]
+        if applied.get(f"rw:{section}") == content["checksum"]:
+            report[section] = {"status": "unchanged"}
+            continue
+        report[section] = await loader(session, content["rows"])
+        await save_checksum(session, f"rw:{section}", content["checksum"])
+        await session.commit()
+    for index in (station_index, etsng_index, gng_index):
+        index.invalidate()
+
+    return {"status": "SUCCESS", "sections": report}
+
+
+async def get_checksums(session: AsyncSession):
+    result = await session.execute(select(ImportChecksum.name, ImportChecksum.checksum))
+    return dict(result.all())
+
+
+async def save_checksum(session: AsyncSession, name: str, checksum: str):
+    row = {"name": name, "checksum": checksum, "updated_at": datetime.now(timezone.utc)}
+    await bulk_upsert(session, ImportChecksum.__table__, [row], ['name'])
+
+
+# Применение разницы: строки снимка сравниваются с таблицей одним запросом,
+# новые вставляются пакетно в обход ORM, изменившиеся обновляются пакетно по id
+async def apply_rows(session: AsyncSession, model, columns, rows):
+    key = columns[0]
+    result = await session.execute(select(model.id, *(getattr(model, c) for c in columns)))
+    existing = {}
+    for row in result.all():
+        existing.setdefault(getattr(row, key), row)
+    new, changed = [], []
+    for values in rows:
+        current = existing.get(values[key])
+        if current is None:
+            new.append(values)
+        elif any(getattr(current, c) != values[c] for c in columns):
+            changed.append({"id": current.id, **values})
+    await bulk_insert(session, model.__table__, columns, new, RW_BATCH_SIZE)
+    if changed:
+        await session.execute(update(model), changed)
+    return {"records": len(rows), "inserted": len(new), "updated": len(changed)}
+
+
+def as_dicts(section, rows):
+    columns = SECTIONS[section][1]
+    return [dict(zip(columns, row)) for row in rows]
 
 
 # Загружаем территории ЖД
-async def load_territories(session):
-    current_dir = os.path.dirname(__file__)
-    json_file = os.path.join(current_dir, 'territories.json')
+async def load_territories(session, rows):
+    return await apply_rows(session, Territory, ('code', 'name'), as_dicts('territories', rows))
 
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
 
-    # Обработка полученного JSON
-    for territory in data:
-        name = territory['name']
-        code = territory['code']
-
-        result = await session.execute(select(Territory).filter(Territory.code == code))
-        obj = result.scalars().first()
-        if not obj:
-            new_territory = Territory(
-                code=code,
-                name=name
-            )
-            session.add(new_territory)
-    await session.commit()
-
-
-# Загружаем территории ЖД
-async def load_stations(session):
-    current_dir = os.path.dirname(__file__)
-    json_file = os.path.join(current_dir, 'stations.json')
-
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Обработка полученного JSON
-    for station in data:
-        name = station['name']
-        code = station['code']
-        territory = station['territory']
-
-        result_ter = await session.execute(select(Territory).filter_by(code=territory))
-        class_ter = result_ter.scalar_one_or_none()
-        territory_id = class_ter.id if class_ter else None
-
-        result = await session.execute(select(Station).filter(Station.code == code))
-        obj = result.scalars().first()
-        if not obj:
-            new_station = Station(
-                code=code,
-                territory_id=territory_id,
-                name=name
-            )
-            session.add(new_station)
-    await session.commit()
+# Загружаем станции; территория - по коду (справочник территорий загружается раньше)
+async def load_stations(session, rows):
+    result = await session.execute(select(Territory.code, Territory.id))
+    territories = dict(result.all())
+    values = []
+    for row in as_dicts('stations', rows):
+        row['territory_id'] = territories.get(row.pop('territory'))
+        if row['territory_id'] is not None:
+            values.append(row)
+    stats = await apply_rows(session, Station, ('code', 'name', 'territory_id'), values)
+    # Станции с неизвестной территорией пропускаются
+    return {**stats, "records": len(rows), "skipped": len(rows) - len(values)}
 
 
 # Загружаем роды ПС
-async def load_wagon_types(session):
-    current_dir = os.path.dirname(__file__)
-    json_file = os.path.join(current_dir, 'wagon_types.json')
-
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Обработка полученного JSON
-    for type_data in data:
-        name = type_data['name']
-        code = type_data['code']
-        platform = type_data['platform']
-        official_name = type_data['official_name']
-
-        result = await session.execute(select(WagonType).filter(WagonType.name == name))
-        obj = result.scalars().first()
-        if not obj:
-            new_wagon_type = WagonType(
-                code=str(code),
-                platform=platform,
-                official_name=official_name,
-                name=name
-            )
-            session.add(new_wagon_type)
-    await session.commit()
+async def load_wagon_types(session, rows):
+    return await apply_rows(session, WagonType, ('code', 'name', 'platform', 'official_name'),
+                            as_dicts('wagon_types', rows))
 
 
 # Загружаем грузы по ЕТСНГ
-async def load_etsn(session):
-    current_dir = os.path.dirname(__file__)
-    json_file = os.path.join(current_dir, 'ETSNG.json')
-
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Обработка полученного JSON
-    for str_data in data:
-        name = str_data['name']
-        code = str(str_data['code'])
-
-        result = await session.execute(select(Etsng).filter(Etsng.code == code))
-        obj = result.scalars().first()
-        if not obj:
-            new_obj = Etsng(
-                code=code,
-                name=name
-            )
-            session.add(new_obj)
-    await session.commit()
+async def load_etsn(session, rows):
+    return await apply_rows(session, Etsng, ('code', 'name'), as_dicts('etsng', rows))
 
 
 # Загружаем грузы по ГНГ
-async def load_gng(session):
-    current_dir = os.path.dirname(__file__)
-    json_file = os.path.join(current_dir, 'GNG.json')
-
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    # Обработка полученного JSON
-    for str_data in data:
-        name = str_data['name']
-        code = str(str_data['code'])
-
-        result = await session.execute(select(Gng).filter(Gng.code == code))
-        obj = result.scalars().first()
-        if not obj:
-            new_obj = Gng(
-                code=code,
-                name=name
-            )
-            session.add(new_obj)
-    await session.commit()
+async def load_gng(session, rows):
+    return await apply_rows(session, Gng, ('code', 'name'), as_dicts('gng', rows))
+
+
+# Порядок загрузки: станции ссылаются на территории
+RW_LOADERS = {
+    'territories': load_territories,
+    'stations': load_stations,
+    'wagon_types': load_wagon_types,
+    'etsng': load_etsn,
+    'gng': load_gng,
+}
@@ -0,0 +1,143 @@
+# Снимок справочников РЖД: нормализованные строки файлов *.json этого каталога
+# в одном сжатом файле с контрольными суммами (по разделам и общей) и хешами
+# исходных файлов. Сборка после обновления файлов справочников:
+#   python -m api.imports.dicts_rw.snapshot
+# Если снимка нет или он собран из других версий файлов, он собирается и сохраняется
+# при загрузке справочников.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = os.path.dirname(__file__)
+SNAPSHOT_PATH = os.getenv("RW_SNAPSHOT_PATH", os.path.join(SOURCE_DIR, "rw_snapshot.bin"))
+SNAPSHOT_MAGIC = b"RWSNAP2\n"
+
+# Раздел: (файл, колонки строки снимка); первая колонка - ключ (код)
+SECTIONS = {
+    'territories': ('territories.json', ('code', 'name')),
+    'stations': ('stations.json', ('code', 'name', 'territory')),
+    'wagon_types': ('wagon_types.json', ('code', 'name', 'platform', 'official_name')),
+    'etsng': ('ETSNG.json', ('code', 'name')),
+    'gng': ('GNG.json', ('code', 'name')),
+}
+
+_snapshot = None
+# Хеши исходных файлов по (mtime_ns, размер): {файл: ((mtime_ns, размер), sha256)}
+_source_hashes = {}
+
+
+def normalize_value(column, value):
+    if column == 'platform':
+        return bool(value)
+    return '' if value is None else str(value)
+
+
+# Строки раздела: списки значений колонок, отсортированные по коду; при повторе кода - первая запись
+def normalize(section, records):
+    columns = SECTIONS[section][1]
+    rows = {}
+    for record in records:
+        row = [normalize_value(column, record.get(column)) for column in columns]
+        rows.setdefault(row[0], row)
+    return [rows[code] for code in sorted(rows)]
+
+
+def checksum(rows):
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode()).hexdigest()
+
+
+# Разделы снимка: {раздел: {"checksum": ..., "rows": [...]}}
+def compile_sections(data):
+    sections = {}
+    for section, records in data.items():
+        rows = normalize(section, records)
+        sections[section] = {"checksum": checksum(rows), "rows": rows}
+    return sections
+
+
+def read_source(file_name):
+    with open(os.path.join(SOURCE_DIR, file_name), 'rb') as f:
+        return f.read()
+
+
+# Хеши исходных файлов: {файл: sha256}; файл перечитывается, только если изменились
+# время его изменения или размер
+def source_hashes():
+    hashes = {}
+    for file_name, _ in SECTIONS.values():
+        stat = os.stat(os.path.join(SOURCE_DIR, file_name))
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = _source_hashes.get(file_name)
+        if cached is None or cached[0] != key:
+            cached = _source_hashes[file_name] = (key, hashlib.sha256(read_source(file_name)).hexdigest())
+        hashes[file_name] = cached[1]
+    return hashes
+
+
+# Содержимое файлов справочников и их хеши
+def read_sources():
+    data, hashes = {}, {}
+    for section, (file_name, _) in SECTIONS.items():
+        content = read_source(file_name)
+        data[section] = json.loads(content)
+        hashes[file_name] = hashlib.sha256(content).hexdigest()
+    return data, hashes
+
+
+# Формат: SNAPSHOT_MAGIC, строка JSON с хешами исходных файлов, sha256 данных, сжатые данные
+def write_snapshot(sections, sources, path=SNAPSHOT_PATH):
+    payload = zlib.compress(json.dumps(sections, ensure_ascii=False, separators=(',', ':')).encode(), 9)
+    header = json.dumps(sources, sort_keys=True).encode() + b"\n" + hashlib.sha256(payload).hexdigest().encode()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + header + b"\n" + payload)
+    os.replace(tmp_path, path)
+
+
+# Чтение снимка с проверкой контрольной суммы: (хеши исходных файлов, разделы);
+# None - снимка нет, он поврежден или в старом формате
+def read_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    sources, _, rest = data[len(SNAPSHOT_MAGIC):].partition(b"\n")
+    digest, _, payload = rest.partition(b"\n")
+    if not data.startswith(SNAPSHOT_MAGIC) or hashlib.sha256(payload).hexdigest().encode() != digest:
+        logger.warning(f"Снимок справочников РЖД {path} поврежден или в старом формате")
+        return None
+    return json.loads(sources), json.loads(zlib.decompress(payload))
+
+
+def build_snapshot(path=SNAPSHOT_PATH):
+    data, sources = read_sources()
+    sections = compile_sections(data)
+    write_snapshot(sections, sources, path)
+    return sources, sections
+
+
+# Снимок для загрузки справочников. Кэшируется в процессе; снимок и кэш, собранные
+# из других версий файлов справочников (по хешам), пересобираются.
+def load_snapshot():
+    global _snapshot
+    sources = source_hashes()
+    if _snapshot is None or _snapshot[0] != sources:
+        snapshot = read_snapshot()
+        if snapshot is None or snapshot[0] != sources or set(snapshot[1]) != set(SECTIONS):
+            logger.info("Сборка снимка справочников РЖД")
+            snapshot = build_snapshot()
+        _snapshot = snapshot
+    return _snapshot[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка снимка справочников РЖД")
+    parser.add_argument("--path", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+    for section, content in build_snapshot(args.path)[1].items():
+        print(f"{section}: {len(content['rows'])} строк, {content['checksum']}")
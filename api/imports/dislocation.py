@@ -1,36 +1,172 @@
+import asyncio
+import hashlib
 import html
-from datetime import date
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
 import httpx
-from fastapi import HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, update, func, or_
 from sqlalchemy.future import select
 from api.dict.Wagon.models import Wagon
 from api.dict.Station.models import Station
 from api.dict.Territory.models import Territory
 from api.dict.Container.models import Container
 from api.dict.Etsng.models import Etsng
-from api.doc.Dislocation.models import Dislocation
+from api.doc.Dislocation.models import Dislocation, DislocationCurrent
+from api.imports.bulk import select_in, bulk_insert, bulk_upsert
+from api.imports.streaming import aiter_sections
 from config.utils import format_date as parse_date
 
+# Колонки таблицы дислокации, заполняемые загрузкой (порядок важен для COPY)
+DISLOCATION_COLUMNS = tuple(c.name for c in Dislocation.__table__.columns if c.name != 'id')
 
-async def load_dislocation(request: Request, session: AsyncSession):
-    json_data = await fetch_railwagon_data()
-    if json_data:
+# Период загрузки в минутах: он же окно added_last_minutes запроса к railwagonlocation
+DISLOCATION_INTERVAL_MINUTES = int(os.getenv("DISLOCATION_INTERVAL_MINUTES", "60"))
+
+# Потоковый разбор выгрузки и размер пачки вагонов для записи в БД
+DISLOCATION_STREAM = os.getenv("DISLOCATION_STREAM", "1") == "1"
+DISLOCATION_BATCH_SIZE = int(os.getenv("DISLOCATION_BATCH_SIZE", "500"))
+
+# Ключ advisory-блокировки загрузки дислокации
+DISLOCATION_LOCK_KEY = 720301
+
+
+# Полный цикл загрузки: чтение выгрузки, разбор и запись в одной транзакции.
+# None - загрузку в этот момент выполняет другой процесс приложения.
+async def load_dislocation(session: AsyncSession):
+    async with session.begin():
+        if not await acquire_import_lock(session):
+            return None
+        return await import_dislocation(session, railwagon_vagons())
+
+
+# На PostgreSQL загрузки разных процессов (воркеров uvicorn) исключаются
+# транзакционной advisory-блокировкой; она снимается при commit/rollback.
+async def acquire_import_lock(session: AsyncSession):
+    conn = await session.connection()
+    if conn.dialect.name != 'postgresql':
+        return True
+    result = await session.execute(select(func.pg_try_advisory_xact_lock(DISLOCATION_LOCK_KEY)))
+    return result.scalar()
+
+
+# Вагоны выгрузки: потоково или после чтения ответа целиком
+async def railwagon_vagons():
+    if DISLOCATION_STREAM:
+        async for vagon in stream_railwagon_data():
+            yield vagon
+    else:
+        json_data = await fetch_railwagon_data()
+        if not json_data:
+            raise ValueError("Не удалось получить данные")
+        for vagon in json_data["vagon"]:
+            yield vagon
+
+
+# Загрузка дислокации пачками по мере поступления вагонов.
+# Чтение выгрузки идет в отдельной задаче и не ждет записи в БД; очередь ограничена,
+# поэтому в памяти одновременно находится не больше нескольких пачек.
+async def import_dislocation(session: AsyncSession, vagons, batch_size: int = DISLOCATION_BATCH_SIZE):
+    queue = asyncio.Queue(maxsize=2)
+
+    async def produce():
         try:
-            async with session.begin():
-                for vagon in json_data["vagon"]:
-                    await parse_vagon_data(vagon, session)
+            batch = []
+            async for vagon in vagons:
+                batch.append(vagon)
+                if len(batch) >= batch_size:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
         except Exception as e:
-            await session.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
+            await queue.put(e)
         else:
-            await session.commit()
-        return {"status": "success"}
-    else:
-        raise HTTPException(status_code=400, detail="Не удалось получить данные")
-
+            await queue.put(None)
 
-async def fetch_railwagon_data():
+    producer = asyncio.create_task(produce())
+    refs = DislocationRefs()
+    stats = {"wagons": 0, "inserted": 0, "skipped": 0}
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+
+            # Справочники по пачке - одним набором запросов, уже известные коды берутся из кэша
+            await refs.prime(session, batch)
+            rows = []
+            for vagon in batch:
+                rows.extend(await parse_vagon_data(vagon, session, refs))
+            stats["wagons"] += len(batch)
+
+            # В историю пишутся только строки, состояние которых изменилось с прошлой загрузки
+            changed = await changed_rows(session, rows)
+            stats["inserted"] += await bulk_insert(session, Dislocation.__table__, DISLOCATION_COLUMNS, changed)
+            stats["skipped"] += len(rows) - len(changed)
+            await upsert_current(session, changed)
+    finally:
+        producer.cancel()
+    return stats
+
+
+# Ключ вагона/контейнера в таблице текущего положения
+def unit_key(row):
+    return f"{row['wagon_id'] or 0}:{row['container_id'] or 0}"
+
+
+# Реквизиты, определяющие состояние вагона/контейнера для отсечения повторов
+FINGERPRINT_COLUMNS = ('operation_code', 'operation', 'station_tek_id', 'station_nazn_id', 'date_oper',
+                       'loaded', 'broken', 'nomer_nakladnoi', 'etsng_id', 'weight')
+
+
+def state_fingerprint(row):
+    state = '|'.join(str(row[c]) for c in FINGERPRINT_COLUMNS)
+    return hashlib.blake2b(state.encode(), digest_size=16).hexdigest()
+
+
+# Строки, отличающиеся от последнего сохраненного состояния своего вагона/контейнера.
+# Операция старее сохраненной (то же условие, что в upsert_current) пропускается:
+# ее отпечаток не сохраняется, и иначе она попадала бы в историю при каждом опросе
+async def changed_rows(session: AsyncSession, rows):
+    for row in rows:
+        row['unit_key'] = unit_key(row)
+        row['fingerprint'] = state_fingerprint(row)
+
+    stmt = select(DislocationCurrent.unit_key, DislocationCurrent.fingerprint, DislocationCurrent.date_oper)
+    result = await select_in(session, stmt, DislocationCurrent.unit_key, {row['unit_key'] for row in rows})
+    last = {key: (fingerprint, date_oper) for key, fingerprint, date_oper in result}
+    changed = []
+    for row in rows:
+        fingerprint, date_oper = last.get(row['unit_key'], (None, None))
+        if fingerprint == row['fingerprint']:
+            continue
+        if date_oper is not None and (row['date_oper'] is None or row['date_oper'] < date_oper):
+            continue
+        last[row['unit_key']] = (row['fingerprint'], row['date_oper'])
+        changed.append(row)
+    return changed
+
+
+# Обновление текущего положения: строка заменяется, только если операция не старее сохраненной
+async def upsert_current(session: AsyncSession, rows):
+    latest = {}
+    for row in rows:
+        key = row['unit_key']
+        if key not in latest or (row['date_oper'] or date.min) >= (latest[key]['date_oper'] or date.min):
+            latest[key] = row
+
+    def is_newer(table, excluded):
+        return or_(table.c.date_oper.is_(None), excluded.date_oper >= table.c.date_oper)
+
+    await bulk_upsert(session, DislocationCurrent.__table__, list(latest.values()),
+                      index_elements=['unit_key'], where=is_newer)
+
+
+def railwagon_request():
     url = 'https://railwagonlocation.com:443/xml/export.php'
     name = 'SSGM LogisticsApi'
     password = 'DsTMQPpJ'
@@ -40,13 +176,18 @@ async def fetch_railwagon_data():
         'password': password,
         'request_type': 'get_user_vagons',
         'all_operations': 'n',
-        'added_last_minutes': '60',
+        'added_last_minutes': str(DISLOCATION_INTERVAL_MINUTES),
         'return_format': 'json'
     }
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
+    return url, params, headers
+
+
+async def fetch_railwagon_data():
+    url, params, headers = railwagon_request()
 
     try:
         async with httpx.AsyncClient() as client:
@@ -60,40 +201,41 @@ async def fetch_railwagon_data():
     return None
 
 
-async def parse_vagon_data(vagon_data, session: AsyncSession):
-    cur_date = date.today()
+# Потоковое чтение выгрузки: вагоны отдаются по одному по мере разбора ответа
+async def stream_railwagon_data():
+    url, params, headers = railwagon_request()
+
+    async with httpx.AsyncClient() as client:
+        async with client.stream('GET', url, params=params, headers=headers) as response:
+            response.raise_for_status()
+            async for key, vagon in aiter_sections(response.aiter_bytes()):
+                if key == "vagon":
+                    yield vagon
+
+
+# Строки дислокации по вагону (по одной на каждый контейнер) в виде словарей для пакетной вставки
+async def parse_vagon_data(vagon_data, session: AsyncSession, refs: "DislocationRefs"):
+    cur_date = datetime.combine(date.today(), time())
     vagon_info = vagon_data["vagon_info"]
     vagon_position = vagon_data["position"]
 
     vagon_or_container = vagon_info['@attributes']['type']
     is_container = vagon_or_container != "vagon"
 
-    container_array = []
+    vagon_no, container_array = vagon_units(vagon_info, vagon_position)
 
     if not is_container:
         owner = html.unescape(vagon_info['vagon_specifications']['owner'])
         owner_code = vagon_info['vagon_specifications']['owner_code']
         next_repair = parse_date(vagon_info['vagon_specifications']['next_repair_date'])
         next_repair_type = vagon_info['vagon_specifications']['next_repair_type']
-        vagon_no = vagon_info["vagon_no"]
-
-        if "containers" in vagon_position:
-            if isinstance(vagon_position["containers"]["container"], list):
-                for cont in vagon_position["containers"]["container"]:
-                    container_array.append(cont["@attributes"]['no'])
-            else:
-                container_array.append(vagon_position["containers"]["container"]["@attributes"]['no'])
-        else:
-            container_array.append('')
     else:
         owner = ''
         owner_code = ''
         next_repair = None
         next_repair_type = ''
-        vagon_no = vagon_info["platform_no"]
-        container_array.append(vagon_info["vagon_no"])
 
-    wagon = await get_wagon(session, vagon_no)
+    wagon = refs.wagons.get(vagon_no)
 
     date_otpr = parse_date(vagon_info["send_date"])
     date_otpr_time = parse_date(vagon_info["send_date_time"])
@@ -122,32 +264,24 @@ async def parse_vagon_data(vagon_data, session: AsyncSession):
     days_wo_operation = await parse_numeric(session, vagon_info['days_wo_operation'])
     days_in_transit = await parse_numeric(session, vagon_info['days_in_transit'])
 
-    station_otpr = await get_station(session, vagon_info["from_code"], vagon_info["from_name"],
-                                     vagon_info["from_latitude"], vagon_info["from_longitude"])
-    station_tek = await get_station(session, vagon_position["current_position_code"],
-                                    vagon_position["current_position"], vagon_position["current_position_latitude"],
-                                    vagon_position["current_position_longitude"])
-    station_nazn = await get_station(session, vagon_info["to_code"], vagon_info["to_name"], vagon_info["to_latitude"],
-                                     vagon_info["to_longitude"])
-
-    etnsng = await get_etsng(session, vagon_position["etsng_code"], vagon_position["state"])
-    prev_etsng = await get_etsng(session, vagon_position["previous_etsng"]["@attributes"]["code"],
-                                 vagon_position["previous_etsng"]["name"])
+    station_otpr, station_tek, station_nazn = [refs.stations.get(st[0]) for st in vagon_stations(vagon_info, vagon_position)]
+    etnsng, prev_etsng = [refs.etsng.get(et[0]) for et in vagon_etsngs(vagon_position)]
 
+    rows = []
     for cont in container_array:
-        model_cont = await get_container(session, cont)
+        model_cont = refs.containers.get(cont)
 
-        dislocation = Dislocation(
+        rows.append(dict(
             date=cur_date,
             wagon_id=wagon,
             container_id=model_cont,
             loaded=loaded,
             nomer_nakladnoi=nomer_nakladnoi,
-            date_otpr=date_otpr,
+            date_otpr=as_date(date_otpr),
             date_otpr_time=date_otpr_time,
-            date_oper=date_oper,
-            date_arrive=date_arrive,
-            date_arrive_plan=date_arrive_plan,
+            date_oper=as_date(date_oper),
+            date_arrive=as_date(date_arrive),
+            date_arrive_plan=as_date(date_arrive_plan),
             station_otpr_id=station_otpr,
             station_tek_id=station_tek,
             station_nazn_id=station_nazn,
@@ -155,11 +289,11 @@ async def parse_vagon_data(vagon_data, session: AsyncSession):
             operation_id=operation_id,
             operation_code=operation_code,
             broken=broken,
-            weight=weight,
+            weight=as_decimal(weight),
             etsng_id=etnsng,
             prev_etsng_id=prev_etsng,
-            distance_end=distance_end,
-            distance_full=distance_full,
+            distance_end=int(distance_end),
+            distance_full=int(distance_full),
             group_name=group_name,
             group_id=group_id,
             gruz_sender=gruz_sender,
@@ -167,38 +301,14 @@ async def parse_vagon_data(vagon_data, session: AsyncSession):
             payer=payer,
             owner=owner,
             owner_code=owner_code,
-            next_repair=next_repair,
+            next_repair=as_date(next_repair),
             next_repair_type=next_repair_type,
-            days_wo_movement=days_wo_movement,
-            days_wo_operation=days_wo_operation,
-            days_in_transit=days_in_transit,
-            vagon_comment=vagon_comment)
-        session.add(dislocation)
-
-    return {"status": "SUCCESS"}
-
-
-async def get_station(session: AsyncSession, st_code, st_name, latitude, longitude):
-    result = await session.execute(select(Station).filter(Station.code == st_code))
-    station = result.scalars().first()
-    if not station:
-        result = await session.execute(select(Territory).filter(Territory.code == '0000'))
-        territory = result.scalars().first()
-        if not territory:
-            territory = Territory(code='0000', name='НЕОПРЕДЕЛЕНО')
-            session.add(territory)
-            await session.flush()
-            await session.refresh(territory)
-        station = Station(name=st_name, code=st_code, territory=territory, latitude=latitude, longitude=longitude)
-        session.add(station)
-        await session.flush()
-        await session.refresh(station)
-    else:
-        if not station.latitude or not station.longitude:
-            station.latitude = latitude
-            station.longitude = longitude
-            await session.flush()
-    return station.id
+            days_wo_movement=as_decimal(days_wo_movement),
+            days_wo_operation=as_decimal(days_wo_operation),
+            days_in_transit=as_decimal(days_in_transit),
+            vagon_comment=vagon_comment))
+
+    return rows
 
 
 async def parse_numeric(session: AsyncSession, state):
@@ -215,46 +325,140 @@ async def parse_numeric(session: AsyncSession, state):
             return 0
 
 
-async def get_etsng(session: AsyncSession, etsgn_code, state):
-    if not isinstance(etsgn_code, str):
-        return None
-
-    if etsgn_code == '':
-        return None
-
-    result = await session.execute(select(Etsng).filter(Etsng.code == etsgn_code))
-    etsng = result.scalars().first()
-    if not etsng:
-        etsng = Etsng(name=state, code=etsgn_code)
-        session.add(etsng)
-        await session.flush()
-        await session.refresh(etsng)
-    return etsng.id
-
-
-async def get_wagon(session: AsyncSession, name):
-    if name == '' or not isinstance(name, str):
-        return None
-
-    result = await session.execute(select(Wagon).filter(Wagon.name == name))
-    obj = result.scalars().first()
-    if not obj:
-        obj = Wagon(name=name)
-        session.add(obj)
-        await session.flush()
-        await session.refresh(obj)
-    return obj.id
-
-
-async def get_container(session: AsyncSession, name):
-    if name == '' or not isinstance(name, str):
-        return None
-
-    result = await session.execute(select(Container).filter(Container.name == name))
-    obj = result.scalars().first()
-    if not obj:
-        obj = Container(name=name)
-        session.add(obj)
-        await session.flush()
-        await session.refresh(obj)
-    return obj.id
+# Приведение значений к типам колонок: COPY не выполняет неявных преобразований
+def as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def as_decimal(value):
+    return Decimal(str(value))
+
+
+# Номер вагона (платформы) и номера контейнеров на нем
+def vagon_units(vagon_info, vagon_position):
+    container_array = []
+    if vagon_info['@attributes']['type'] == "vagon":
+        vagon_no = vagon_info["vagon_no"]
+        if "containers" in vagon_position:
+            if isinstance(vagon_position["containers"]["container"], list):
+                for cont in vagon_position["containers"]["container"]:
+                    container_array.append(cont["@attributes"]['no'])
+            else:
+                container_array.append(vagon_position["containers"]["container"]["@attributes"]['no'])
+        else:
+            container_array.append('')
+    else:
+        vagon_no = vagon_info["platform_no"]
+        container_array.append(vagon_info["vagon_no"])
+    return vagon_no, container_array
+
+
+# Станции отправления, текущая и назначения: (код, наименование, широта, долгота)
+def vagon_stations(vagon_info, vagon_position):
+    return [
+        (vagon_info["from_code"], vagon_info["from_name"], vagon_info["from_latitude"], vagon_info["from_longitude"]),
+        (vagon_position["current_position_code"], vagon_position["current_position"],
+         vagon_position["current_position_latitude"], vagon_position["current_position_longitude"]),
+        (vagon_info["to_code"], vagon_info["to_name"], vagon_info["to_latitude"], vagon_info["to_longitude"]),
+    ]
+
+
+# Груз и предыдущий груз по ЕТСНГ: (код, наименование)
+def vagon_etsngs(vagon_position):
+    return [
+        (vagon_position["etsng_code"], vagon_position["state"]),
+        (vagon_position["previous_etsng"]["@attributes"]["code"], vagon_position["previous_etsng"]["name"]),
+    ]
+
+
+def is_code(value):
+    return isinstance(value, str) and value != ''
+
+
+# Кэш справочников на время загрузки дислокации: код -> id.
+# Все ключи выгрузки собираются заранее, известные читаются через IN (...),
+# недостающие создаются пакетной вставкой.
+class DislocationRefs:
+    def __init__(self):
+        self.stations = {}
+        self.etsng = {}
+        self.wagons = {}
+        self.containers = {}
+        self.territory_id = None
+
+    async def prime(self, session: AsyncSession, vagons):
+        stations, etsngs, wagons, containers = {}, {}, set(), set()
+        for vagon in vagons:
+            vagon_info = vagon["vagon_info"]
+            vagon_position = vagon["position"]
+            vagon_no, container_array = vagon_units(vagon_info, vagon_position)
+            if is_code(vagon_no):
+                wagons.add(vagon_no)
+            containers.update(cont for cont in container_array if is_code(cont))
+            for st in vagon_stations(vagon_info, vagon_position):
+                if is_code(st[0]):
+                    stations.setdefault(st[0], st)
+            for et in vagon_etsngs(vagon_position):
+                if is_code(et[0]):
+                    etsngs.setdefault(et[0], et)
+
+        await self.prime_stations(session, stations)
+        await self.prime_named(session, Etsng, Etsng.code, self.etsng,
+                               {code: {"code": code, "name": name if isinstance(name, str) else ''}
+                                for code, name in etsngs.values()})
+        await self.prime_named(session, Wagon, Wagon.name, self.wagons,
+                               {name: {"name": name} for name in wagons})
+        await self.prime_named(session, Container, Container.name, self.containers,
+                               {name: {"name": name} for name in containers})
+
+    # Поиск по ключу и вставка отсутствующих записей справочника
+    async def prime_named(self, session: AsyncSession, model, key, cache, new_rows):
+        missing = [k for k in new_rows if k not in cache]
+        if not missing:
+            return
+        for k, obj_id in await select_in(session, select(key, model.id).order_by(model.id), key, missing):
+            cache.setdefault(k, obj_id)
+
+        to_create = [new_rows[k] for k in missing if k not in cache]
+        if to_create:
+            await session.execute(insert(model), to_create)
+            created = [row[key.key] for row in to_create]
+            for k, obj_id in await select_in(session, select(key, model.id).order_by(model.id), key, created):
+                cache.setdefault(k, obj_id)
+
+    async def prime_stations(self, session: AsyncSession, stations):
+        missing = [code for code in stations if code not in self.stations]
+        if not missing:
+            return
+        coords = []
+        stmt = select(Station.code, Station.id, Station.latitude, Station.longitude)
+        for code, st_id, latitude, longitude in await select_in(session, stmt, Station.code, missing):
+            self.stations[code] = st_id
+            if not latitude or not longitude:
+                _, _, new_latitude, new_longitude = stations[code]
+                coords.append({"id": st_id, "latitude": new_latitude, "longitude": new_longitude})
+        if coords:
+            await session.execute(update(Station), coords)
+
+        to_create = [stations[code] for code in missing if code not in self.stations]
+        if to_create:
+            territory_id = await self.get_territory_id(session)
+            await session.execute(insert(Station), [
+                {"code": code, "name": name, "territory_id": territory_id, "latitude": latitude, "longitude": longitude}
+                for code, name, latitude, longitude in to_create
+            ])
+            created = [st[0] for st in to_create]
+            for code, st_id in await select_in(session, select(Station.code, Station.id), Station.code, created):
+                self.stations[code] = st_id
+
+    # Территория по умолчанию для станций, отсутствующих в справочнике
+    async def get_territory_id(self, session: AsyncSession):
+        if self.territory_id is None:
+            result = await session.execute(select(Territory).filter(Territory.code == '0000'))
+            territory = result.scalars().first()
+            if not territory:
+                territory = Territory(code='0000', name='НЕОПРЕДЕЛЕНО')
+                session.add(territory)
+                await session.flush()
+            self.territory_id = territory.id
+        return self.territory_id
@@ -0,0 +1,122 @@
+# Архивация старой истории дислокации в сжатые файлы NDJSON (по файлу на месяц).
+# Запуск из корня проекта по расписанию (cron):
+#   python -m api.imports.dislocation_archive --days 180
+import argparse
+import asyncio
+import gzip
+import heapq
+import json
+import os
+from datetime import datetime, date, timedelta
+from typing import Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.doc.Dislocation.models import Dislocation
+from config.db import async_session
+
+# Каталог архива и возраст строк (в днях), после которого они переносятся в архив
+ARCHIVE_DIR = os.getenv("DISLOCATION_ARCHIVE_DIR", "archive/dislocation")
+ARCHIVE_DAYS = int(os.getenv("DISLOCATION_ARCHIVE_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("DISLOCATION_ARCHIVE_BATCH_SIZE", "5000"))
+
+
+def archive_path(year: int, month: int):
+    return os.path.join(ARCHIVE_DIR, f"dislocation_{year}-{month:02d}.ndjson.gz")
+
+
+def to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+# Дописывание строк в файлы их месяцев: каждая пачка - отдельный gzip-член файла
+def write_archive(rows):
+    by_month = {}
+    for row in rows:
+        by_month.setdefault((row['date'].year, row['date'].month), []).append(row)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for (year, month), month_rows in by_month.items():
+        with gzip.open(archive_path(year, month), 'at', encoding='utf-8') as f:
+            for row in month_rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=to_json) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# Перенос строк старше days дней в архив с удалением из таблицы пачками.
+# Пачка удаляется только после записи в файл; при сбое между ними строка может
+# попасть в архив дважды - при чтении дубли отсекаются по id.
+async def archive_dislocation(session: AsyncSession, days: int = ARCHIVE_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE):
+    cutoff = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    table = Dislocation.__table__
+    archived = 0
+    while True:
+        result = await session.execute(
+            select(table).where(table.c.date < cutoff).order_by(table.c.id).limit(batch_size)
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+        if not rows:
+            break
+        await asyncio.to_thread(write_archive, rows)
+        ids = [row['id'] for row in rows]
+        await session.execute(delete(table).where(table.c.date < cutoff, table.c.id.in_(ids)))
+        await session.commit()
+        archived += len(rows)
+    return {"archived": archived, "cutoff": cutoff.isoformat()}
+
+
+def archive_months(date_from: date, date_to: date):
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+# Строки файла месяца, подходящие под фильтр; файл читается потоково
+def scan_month(path, date_from: date, date_to: date, wagon_id=None, container_id=None):
+    seen = set()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            if wagon_id is not None and row['wagon_id'] != wagon_id:
+                continue
+            if container_id is not None and row['container_id'] != container_id:
+                continue
+            if not date_from.isoformat() <= row['date'][:10] <= date_to.isoformat():
+                continue
+            # Дубли после сбоя архивации отсекаются по id
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+            yield row
+
+
+# Чтение архива за период с фильтром по вагону/контейнеру (генератор).
+# Месяцы читаются по порядку, строки месяца отдаются по (date, id); с limit в памяти
+# держится не больше limit строк месяца, и чтение прекращается после limit строк.
+def read_archive(date_from: date, date_to: date, wagon_id=None, container_id=None, limit: Optional[int] = None):
+    remaining = limit
+    for year, month in archive_months(date_from, date_to):
+        if remaining is not None and remaining <= 0:
+            return
+        path = archive_path(year, month)
+        if not os.path.exists(path):
+            continue
+        rows = scan_month(path, date_from, date_to, wagon_id, container_id)
+        key = lambda row: (row['date'], row['id'])
+        rows = sorted(rows, key=key) if remaining is None else heapq.nsmallest(remaining, rows, key=key)
+        yield from rows
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+async def main(args):
+    async with async_session() as session:
+        print(await archive_dislocation(session, args.days))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Архивация истории дислокации")
+    parser.add_argument("--days", type=int, default=ARCHIVE_DAYS)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+# Обслуживание секций таблицы dislocation (PostgreSQL).
+# Запуск из корня проекта по расписанию (cron):
+#   python -m api.imports.dislocation_partitions create --months 3
+#   python -m api.imports.dislocation_partitions detach --keep 24
+import argparse
+import asyncio
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.db import async_session
+
+
+def month_start(value: date, shift: int = 0):
+    month = value.year * 12 + value.month - 1 + shift
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date):
+    return f"dislocation_y{month.year}m{month.month:02d}"
+
+
+async def is_partitioned(session: AsyncSession):
+    conn = await session.connection()
+    if conn.dialect.name != 'postgresql':
+        return False
+    result = await session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'dislocation'::regclass"
+    ))
+    return result.first() is not None
+
+
+# Секции на текущий и months следующих месяцев
+async def create_partitions(session: AsyncSession, months: int = 3):
+    if not await is_partitioned(session):
+        return []
+    created = []
+    for shift in range(months + 1):
+        start = month_start(date.today(), shift)
+        name = partition_name(start)
+        result = await session.execute(text("SELECT to_regclass(:name)"), {"name": name})
+        if result.scalar() is None:
+            await create_partition(session, name, start, month_start(start, 1))
+            created.append(name)
+    await session.commit()
+    return created
+
+
+# Строки месяца, уже попавшие в секцию по умолчанию, переносятся в новую секцию:
+# иначе CREATE TABLE ... PARTITION OF завершится ошибкой
+async def create_partition(session: AsyncSession, name: str, start: date, end: date):
+    bounds = {"start": start, "end": end}
+    in_range = "date >= :start AND date < :end"
+    result = await session.execute(text(f"SELECT count(*) FROM dislocation_default WHERE {in_range}"), bounds)
+    moved = result.scalar()
+    if moved:
+        await session.execute(text(
+            f"CREATE TEMP TABLE dislocation_moved AS SELECT * FROM dislocation_default WHERE {in_range}"
+        ), bounds)
+        await session.execute(text(f"DELETE FROM dislocation_default WHERE {in_range}"), bounds)
+    await session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF dislocation "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if moved:
+        await session.execute(text("INSERT INTO dislocation SELECT * FROM dislocation_moved"))
+        await session.execute(text("DROP TABLE dislocation_moved"))
+
+
+# Отсоединение секций старше keep месяцев; таблицы остаются для архивации или удаления
+async def detach_partitions(session: AsyncSession, keep: int = 24):
+    if not await is_partitioned(session):
+        return []
+    result = await session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'dislocation'::regclass AND c.relname LIKE 'dislocation_y%m%'"
+    ))
+    oldest = partition_name(month_start(date.today(), -keep))
+    detached = []
+    for name in sorted(result.scalars().all()):
+        if name < oldest:
+            await session.execute(text(f"ALTER TABLE dislocation DETACH PARTITION {name}"))
+            detached.append(name)
+    await session.commit()
+    return detached
+
+
+async def main(args):
+    async with async_session() as session:
+        if args.command == "create":
+            names = await create_partitions(session, args.months)
+        else:
+            names = await detach_partitions(session, args.keep)
+    print(f"{args.command}: {', '.join(names) if names else 'нет изменений'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Секции таблицы dislocation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create_parser = subparsers.add_parser("create", help="создать секции на будущие месяцы")
+    create_parser.add_argument("--months", type=int, default=3)
+    detach_parser = subparsers.add_parser("detach", help="отсоединить старые секции")
+    detach_parser.add_argument("--keep", type=int, default=24)
+    asyncio.run(main(parser.parse_args()))
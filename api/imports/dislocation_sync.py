@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from api.imports.dislocation import load_dislocation, DISLOCATION_INTERVAL_MINUTES
+from config.db import async_session
+
+logger = logging.getLogger(__name__)
+
+# Автоматическая загрузка по расписанию; при выключенной - только по запросу
+DISLOCATION_SYNC_ENABLED = os.getenv("DISLOCATION_SYNC_ENABLED", "1") == "1"
+
+
+# Фоновая загрузка дислокации внутри процесса приложения.
+# Загрузки выполняются одной задачей по очереди и никогда не пересекаются:
+# запуск по расписанию и по запросу только будят эту задачу.
+class DislocationSync:
+    def __init__(self, interval_minutes: int = DISLOCATION_INTERVAL_MINUTES, enabled: bool = DISLOCATION_SYNC_ENABLED):
+        self.interval = interval_minutes * 60
+        self.enabled = enabled
+        self.lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.next_run = None
+        self.last_run = {}
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.loop())
+            # Первая загрузка - сразу после старта приложения
+            if self.enabled:
+                self.wakeup.set()
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    # Поставить загрузку в очередь; повторные вызовы до ее начала объединяются
+    def trigger(self):
+        self.wakeup.set()
+        return {"status": "queued", "running": self.lock.locked()}
+
+    async def loop(self):
+        while True:
+            timeout = self.interval if self.enabled else None
+            self.next_run = datetime.now() + timedelta(seconds=timeout) if timeout else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.run()
+
+    async def run(self):
+        async with self.lock:
+            started = time.perf_counter()
+            run = {"started_at": datetime.now().isoformat(timespec="seconds")}
+            try:
+                async with async_session() as session:
+                    stats = await load_dislocation(session)
+                if stats is None:
+                    run["status"] = "skipped"
+                else:
+                    run.update(status="success", **stats)
+            except Exception as e:
+                logger.exception("Ошибка загрузки дислокации")
+                run.update(status="error", error=str(e))
+            run["duration"] = round(time.perf_counter() - started, 3)
+            self.last_run = run
+            logger.info(f"Загрузка дислокации: {run}")
+            return run
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "interval_minutes": self.interval // 60,
+            "running": self.lock.locked(),
+            "queued": self.wakeup.is_set(),
+            "next_run": self.next_run.isoformat(timespec="seconds") if self.next_run else None,
+            "last_run": self.last_run,
+        }
+
+
+dislocation_sync = DislocationSync()
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, JSON
+from sqlalchemy.sql import func
+from config.db import Base
+
+
+# Последняя примененная версия обмена с 1С по каждому разделу выгрузки
+class ImportWatermark(Base):
+    __tablename__ = "import_watermarks"
+
+    entity = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"'{self.entity}: {self.version}'"
+
+
+# Контрольная сумма последних примененных данных (разделы снимка справочников РЖД)
+class ImportChecksum(Base):
+    __tablename__ = "import_checksums"
+
+    name = Column(String(50), primary_key=True)
+    checksum = Column(String(64), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"'{self.name}: {self.checksum}'"
+
+
+# Задание загрузки из 1С: состояние и отчет (ход и результат по разделам).
+# owner - процесс, выполняющий задание (хост:pid): тело запроса хранится у него локально
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False)
+    owner = Column(String(100), nullable=False)
+    report = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"'{self.id}: {self.status}'"
@@ -0,0 +1,181 @@
+import codecs
+import json
+import re
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Разбор JSON-документа вида {"раздел": [...], ...} по мере поступления данных.
+# Элементы массивов верхнего уровня отдаются по одному как (раздел, элемент),
+# прочие значения верхнего уровня - целиком как (раздел, значение).
+# В памяти держится только текущий элемент, а не весь документ.
+
+WHITESPACE = ' \t\n\r'
+# Продолжение числа до конца буфера
+NUMBER_TAIL = re.compile(r'[0-9+\-.eE]*\Z')
+
+
+class JsonSectionParser:
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.state = 'start'
+        self.key = None
+        # Повторный разбор незавершенного элемента - только после заметного роста буфера
+        self.retry_at = 0
+
+    def feed(self, data: bytes):
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(data)
+        self.retry_at -= self.pos
+        self.pos = 0
+        if len(self.buf) < self.retry_at:
+            return []
+        return self.parse(final=False)
+
+    def close(self):
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(b'', final=True)
+        self.pos = 0
+        events = self.parse(final=True)
+        if self.state != 'end' or self.buf[self.pos:].strip(WHITESPACE):
+            raise json.JSONDecodeError("Неожиданный конец JSON", self.buf, self.pos)
+        return events
+
+    def skip_ws(self):
+        while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+            self.pos += 1
+        return self.pos < len(self.buf)
+
+    def expect(self, chars):
+        char = self.buf[self.pos]
+        if char not in chars:
+            raise json.JSONDecodeError(f"Ожидался один из символов {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    # Разбор одного значения; None - значение еще не получено полностью
+    def decode_value(self, final):
+        try:
+            value, end = self.decoder.raw_decode(self.buf, self.pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            self.retry_at = len(self.buf) + (len(self.buf) - self.pos)
+            return None
+        # Число, за которым до конца буфера идут только символы числа, может продолжиться
+        # в следующей порции ("1." + "5", "1.5e" + "3"): разбор откладывается
+        if not final and isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and NUMBER_TAIL.match(self.buf, end):
+            return None
+        self.pos = end
+        return (value,)
+
+    def parse(self, final):
+        events = []
+        while self.state != 'end' and self.skip_ws():
+            if self.state == 'start':
+                self.expect('{')
+                self.state = 'first_key'
+            elif self.state in ('first_key', 'key'):
+                if self.state == 'first_key' and self.buf[self.pos] == '}':
+                    self.pos += 1
+                    self.state = 'end'
+                    continue
+                if self.buf[self.pos] != '"':
+                    raise json.JSONDecodeError("Ожидалось имя раздела", self.buf, self.pos)
+                decoded = self.decode_value(final)
+                if decoded is None:
+                    break
+                self.key = decoded[0]
+                self.state = 'colon'
+            elif self.state == 'colon':
+                self.expect(':')
+                self.state = 'value'
+            elif self.state == 'value':
+                if self.buf[self.pos] == '[':
+                    self.pos += 1
+                    self.state = 'first_item'
+                    continue
+                decoded = self.decode_value(final)
+                if decoded is None:
+                    break
+                events.append((self.key, decoded[0]))
+                self.state = 'after_value'
+            elif self.state in ('first_item', 'item'):
+                if self.state == 'first_item' and self.buf[self.pos] == ']':
+                    self.pos += 1
+                    self.state = 'after_value'
+                    continue
+                decoded = self.decode_value(final)
+                if decoded is None:
+                    break
+                events.append((self.key, decoded[0]))
+                self.state = 'after_item'
+            elif self.state == 'after_item':
+                self.state = 'item' if self.expect(',]') == ',' else 'after_value'
+            elif self.state == 'after_value':
+                self.state = 'key' if self.expect(',}') == ',' else 'end'
+        return events
+
+
+# То же для MessagePack: словарь верхнего уровня, значения которого - массивы записей.
+# Требует пакета msgpack; его Unpacker сам откатывает незавершенный объект до новой порции.
+class MsgpackSectionParser:
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("Для разбора MessagePack нужен пакет msgpack")
+        self.unpacker = msgpack.Unpacker(raw=False)
+        self.state = 'start'
+        self.key = None
+        self.keys = 0
+        self.items = 0
+
+    def feed(self, data: bytes):
+        self.unpacker.feed(data)
+        return self.parse()
+
+    def close(self):
+        events = self.parse()
+        if self.state != 'end':
+            raise ValueError("Неожиданный конец MessagePack")
+        return events
+
+    def parse(self):
+        events = []
+        try:
+            while self.state != 'end':
+                if self.state == 'start':
+                    self.keys = self.unpacker.read_map_header()
+                    self.state = 'key'
+                elif self.state == 'key':
+                    if not self.keys:
+                        self.state = 'end'
+                        continue
+                    self.key = self.unpacker.unpack()
+                    self.keys -= 1
+                    self.state = 'value'
+                elif self.state == 'value':
+                    self.items = self.unpacker.read_array_header()
+                    self.state = 'item'
+                elif self.state == 'item':
+                    if not self.items:
+                        self.state = 'key'
+                        continue
+                    events.append((self.key, self.unpacker.unpack()))
+                    self.items -= 1
+        except msgpack.OutOfData:
+            pass
+        return events
+
+
+# Асинхронный разбор потока байтов (например, response.aiter_bytes())
+async def aiter_sections(chunks, parser_class=JsonSectionParser):
+    parser = parser_class()
+    async for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
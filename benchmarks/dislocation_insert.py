@@ -0,0 +1,68 @@
+# Сравнение вставки строк дислокации: ORM (session.add) и пакетная вставка (bulk_insert).
+# Запуск из корня проекта: python -m benchmarks.dislocation_insert [кол-во строк]
+# По умолчанию используется DATABASE_URL из config/.env; таблица dislocation очищается.
+import asyncio
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import delete
+
+import api  # noqa: F401  регистрация всех моделей
+from api.doc.Dislocation.models import Dislocation
+from api.imports.bulk import bulk_insert
+from api.imports.dislocation import DISLOCATION_COLUMNS
+from config.db import Base, async_session, engine
+
+
+def make_rows(count: int):
+    now = datetime.combine(date.today(), datetime.min.time())
+    return [dict(
+        date=now, wagon_id=None, container_id=None, loaded=True, nomer_nakladnoi=f"ЭА{i}",
+        date_otpr=date(2024, 6, 1), date_otpr_time=datetime(2024, 6, 1, 7, 45), date_oper=date(2024, 6, 17),
+        date_arrive=None, date_arrive_plan=date(2024, 6, 9), station_otpr_id=None, station_tek_id=None,
+        station_nazn_id=None, operation="Прибытие", operation_id="1", operation_code="2", broken=False,
+        weight=Decimal("68.5"), etsng_id=None, prev_etsng_id=None, distance_end=100, distance_full=1000,
+        group_name="", group_id="", gruz_sender="", gruz_receiver="", payer="", owner="", owner_code="",
+        next_repair=None, next_repair_type="", days_wo_movement=Decimal("1"), days_wo_operation=Decimal("2.5"),
+        days_in_transit=Decimal("3"), vagon_comment="",
+    ) for i in range(count)]
+
+
+async def orm_path(rows):
+    async with async_session() as session:
+        async with session.begin():
+            for row in rows:
+                session.add(Dislocation(**row))
+
+
+async def bulk_path(rows):
+    async with async_session() as session:
+        async with session.begin():
+            await bulk_insert(session, Dislocation.__table__, DISLOCATION_COLUMNS, rows)
+
+
+async def clear():
+    async with async_session() as session:
+        async with session.begin():
+            await session.execute(delete(Dislocation))
+
+
+async def main(count: int):
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Dislocation.__table__])
+
+    rows = make_rows(count)
+    for name, path in (("ORM session.add", orm_path), ("bulk_insert", bulk_path)):
+        await clear()
+        started = time.perf_counter()
+        await path(rows)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<16} {count} строк: {elapsed:.3f} c ({count / elapsed:,.0f} строк/с)")
+    await clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
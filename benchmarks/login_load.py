@@ -0,0 +1,70 @@
+# Нагрузочный тест входа: параллельные POST /login и одновременно - опрос легкого
+# endpoint (GET /load_dislocation), по которому считаются p50/p99 задержки.
+# Сравниваются bcrypt прямо в цикле событий (inline) и в пуле потоков (pool).
+# Приложение вызывается в процессе через httpx.ASGITransport.
+# Запуск из корня проекта: python -m benchmarks.login_load [параллельных входов] [секунд]
+# По умолчанию используется DATABASE_URL из config/.env; нужен пользователь admin/admin.
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+import main
+from api.auth.routes.users import create_initial_user
+from config.db import Base, async_session, engine
+from config.utils import password_hasher
+
+
+async def login_loop(client, deadline, counter):
+    while time.perf_counter() < deadline:
+        response = await client.post("/login", data={"username": "admin", "password": "admin"})
+        counter[response.status_code] = counter.get(response.status_code, 0) + 1
+
+
+async def probe_loop(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/load_dislocation")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def measure(logins: int, seconds: float):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + seconds
+        counter, latencies = {}, []
+        await asyncio.gather(
+            probe_loop(client, deadline, latencies),
+            *(login_loop(client, deadline, counter) for _ in range(logins)),
+        )
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return counter, statistics.median(latencies), p99
+
+
+async def main_(logins: int, seconds: float):
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        await create_initial_user(session)
+
+    pooled = password_hasher.run
+
+    async def inline(func, *args):
+        return func(*args)
+
+    for name, run in (("inline", inline), ("pool", pooled)):
+        password_hasher.run = run
+        counter, p50, p99 = await measure(logins, seconds)
+        print(f"{name:<7} входов: {counter}, опрос p50 {p50:.1f} мс, p99 {p99:.1f} мс")
+    password_hasher.run = pooled
+    print(password_hasher.stats())
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main_(int(args[0]) if args else 8, float(args[1]) if len(args) > 1 else 5))
@@ -0,0 +1,78 @@
+# Накладные расходы middleware на запрос: прежний BaseHTTPMiddleware (сессия БД на каждый
+# запрос) и чистый ASGI DbSessionMiddleware (ленивая сессия, статика и документация - в обход).
+# Приложение вызывается напрямую через ASGI, без сети и HTTP-клиента.
+# Запуск из корня проекта: python -m benchmarks.middleware_overhead [кол-во запросов]
+import asyncio
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from config.db import async_session
+from config.middleware import DbSessionMiddleware
+
+
+# Прежняя схема без проверки токенов: BaseHTTPMiddleware и сессия на каждый запрос
+async def base_http_middleware(request, call_next):
+    async with async_session() as session:
+        request.state.db = session
+        return await call_next(request)
+
+
+def make_app(middleware):
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    middleware(app)
+    return app
+
+
+async def call(app, path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    # После тела запроса - ожидание отключения клиента, которого не будет
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, path, count):
+    for _ in range(100):
+        await call(app, path)
+    started = time.perf_counter()
+    for _ in range(count):
+        await call(app, path)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def main(count: int, static_path: str):
+    apps = {
+        "без middleware": make_app(lambda app: None),
+        "BaseHTTPMiddleware": make_app(lambda app: app.add_middleware(BaseHTTPMiddleware, dispatch=base_http_middleware)),
+        "DbSessionMiddleware": make_app(lambda app: app.add_middleware(DbSessionMiddleware)),
+    }
+    for path in ("/ping", static_path):
+        for name, app in apps.items():
+            print(f"{path:<24} {name:<20} {await measure(app, path, count):8.1f} мкс/запрос")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, "/static/css/styles.css"))
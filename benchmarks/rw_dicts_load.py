@@ -0,0 +1,67 @@
+# Холодная загрузка справочников РЖД (территории, станции, роды ПС, ЕТСНГ, ГНГ):
+# построчно (SELECT на каждую запись, как раньше) и пакетно (RW_LOADERS).
+# Запуск из корня проекта: python -m benchmarks.rw_dicts_load
+# По умолчанию используется DATABASE_URL из config/.env; таблицы справочников очищаются.
+import asyncio
+import time
+
+from sqlalchemy import delete, select
+
+import api  # noqa: F401  регистрация всех моделей
+from api.dict.Etsng.models import Etsng
+from api.dict.Gng.models import Gng
+from api.dict.Station.models import Station
+from api.dict.Territory.models import Territory
+from api.dict.WagonType.models import WagonType
+from api.imports.dicts_rw.data_rw import RW_LOADERS, as_dicts
+from api.imports.dicts_rw.snapshot import load_snapshot
+from config.db import Base, async_session, engine
+
+MODELS = {'territories': Territory, 'stations': Station, 'wagon_types': WagonType, 'etsng': Etsng, 'gng': Gng}
+
+
+async def row_path(sections):
+    async with async_session() as session:
+        for section, model in MODELS.items():
+            for row in as_dicts(section, sections[section]["rows"]):
+                if section == 'stations':
+                    result = await session.execute(select(Territory).filter_by(code=row.pop('territory')))
+                    row['territory_id'] = result.scalar_one().id
+                result = await session.execute(select(model).filter(model.code == row['code']))
+                if not result.scalars().first():
+                    session.add(model(**row))
+            await session.commit()
+
+
+async def bulk_path(sections):
+    async with async_session() as session:
+        for section, loader in RW_LOADERS.items():
+            await loader(session, sections[section]["rows"])
+            await session.commit()
+
+
+async def clear():
+    async with async_session() as session:
+        async with session.begin():
+            for model in reversed(MODELS.values()):
+                await session.execute(delete(model))
+
+
+async def main():
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[model.__table__ for model in MODELS.values()])
+
+    sections = load_snapshot()
+    count = sum(len(sections[section]["rows"]) for section in MODELS)
+    for name, path in (("построчно", row_path), ("пакетно", bulk_path)):
+        await clear()
+        started = time.perf_counter()
+        await path(sections)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<10} {count} строк: {elapsed:.3f} c ({count / elapsed:,.0f} строк/с)")
+    await clear()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
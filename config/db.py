@@ -1,4 +1,5 @@
 # config/db.py
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
@@ -16,6 +17,17 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Асинхронное подключение к бд
 engine = create_async_engine(DATABASE_URL, echo=True)
+
+# SQLite: драйвер сам не начинает транзакцию перед SAVEPOINT, и RELEASE фиксирует данные.
+# Транзакцию начинаем явно, чтобы begin_nested() работал как в PostgreSQL.
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def sqlite_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN")
 async_session = sessionmaker(
     autocommit=False,
     autoflush=False,
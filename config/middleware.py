@@ -1,16 +1,18 @@
 
-from config.db import async_session, get_db
+from config.db import async_session
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.requests import Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 import logging
 from jose import jwt, JWTError
-from api.auth.models import User, UserSession
+from api.auth.models import User
 from api.auth.routes.token import update_tokens, set_tokens_cookie, SECRET_KEY, ALGORITHM
 from api.auth.routes.session import end_user_session
+from api.auth.traffic import traffic_accounting
+from api.auth.session_index import session_index
+from api.auth.principal import principal_cache
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -31,70 +33,167 @@ def add_cors_middleware(app: FastAPI):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
-# DB session and traffic tracking middleware
-async def db_session_middleware(request: Request, call_next):
-    async with async_session() as session:
-        request.state.db = session
+# Пути без сессии БД и проверки токенов: статика и документация API
+BYPASS_PREFIXES = ("/static", "/docs", "/redoc", "/openapi.json", "/favicon.ico")
 
-        # Check and update tokens if necessary
-        auth_header = request.headers.get('Authorization')
+
+# Сессия БД, которая открывается при первом обращении к ней
+class LazySession:
+    def __init__(self):
+        self.session = None
+
+    def get(self) -> AsyncSession:
+        if self.session is None:
+            self.session = async_session()
+        return self.session
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+def decode_token(token: str):
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+def bearer_token(auth_header):
+    parts = (auth_header or "").split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        return parts[1]
+    return None
+
+
+# DB session and traffic tracking middleware (чистый ASGI, без BaseHTTPMiddleware).
+# Просроченный access token при действующем refresh token обновляется: новый access token
+# возвращается в заголовке Authorization, новый refresh token - в cookie.
+# Просроченный refresh token завершает сессию пользователя и дает 401.
+class DbSessionMiddleware:
+    def __init__(self, app, bypass_prefixes=BYPASS_PREFIXES):
+        self.app = app
+        self.bypass_prefixes = bypass_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.bypass_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        session = LazySession()
+        scope.setdefault("state", {})["db"] = session
+        try:
+            await self.handle(scope, receive, send, session)
+        finally:
+            await session.close()
+
+    async def handle(self, scope, receive, send, session):
+        request = Request(scope)
+        auth_header = request.headers.get("authorization")
         refresh_token = request.cookies.get("refresh_token")
 
-        if auth_header:
-            token_type, token = auth_header.split()
-            if token_type.lower() == 'bearer':
-                try:
-                    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                except JWTError:
-                    if refresh_token:
-                        try:
-                            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-                            new_access_token, new_refresh_token = update_tokens(refresh_token)
-                            logger.info(f"Access token обновлен для пользователя {payload.get('username')}")
-                            response = await call_next(request)
-                            response.headers["Authorization"] = f"Bearer {new_access_token}"
-                            set_tokens_cookie(response, new_refresh_token)
-                            return response
-                        except JWTError:
-                            # Refresh token is invalid or expired
-                            await end_user_session(payload.get("user_id"), session)
-                            logger.info(f"Refresh token истек для пользователя {payload.get('username')}")
-                            response = JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Refresh token истек"})
-                            response.delete_cookie("refresh_token")
-                            return response
-
-        elif refresh_token:
+        # Check and update tokens if necessary
+        new_tokens = None
+        access_token = bearer_token(auth_header)
+        # Пользователь запроса для учета трафика: по действующему access token
+        # или по refresh token, по которому токены обновлены
+        access_payload = decode_token(access_token) if access_token is not None else None
+        user_id = access_payload.get("user_id") if access_payload is not None else None
+        if access_token is not None and refresh_token and access_payload is None:
+            payload = decode_token(refresh_token)
+            if payload is None:
+                await self.reject(refresh_token, session, scope, receive, send)
+                return
+            # Текущий refresh token сессии: тот же или, если токен только что заменен
+            # параллельным запросом, новый. Сессии нет (выход, вход с другого устройства,
+            # токен заменен давно) - 401 без завершения сессии и без сброса cookie
+            current = await session_index.resolve(session, refresh_token)
+            if current is None:
+                await self.deny(payload, scope, receive, send)
+                return
+            # Токены отозваны (смена имени, роли, пароля) - обновление по ним давало бы
+            # отклоняемый access token, поэтому сессия завершается
+            principal = await principal_cache.load(session, payload.get("user_id"), payload.get("ver", 0))
+            if principal is None or principal.token_version != payload.get("ver", 0):
+                await self.reject(current, session, scope, receive, send)
+                return
             try:
-                payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-            except JWTError:
-                # Refresh token is invalid or expired
-                await end_user_session(payload.get("user_id"), session)
-                logger.info(f"Refresh token истек для пользователя {payload.get('username')}")
-                response = JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Refresh token истек"})
-                response.delete_cookie("refresh_token")
-                return response
-
-        response = await call_next(request)
-
-        # Traffic tracking
-        token = request.headers.get("authorization")
-        if token:
-            token = token.split(" ")[1]
-
-            result = await session.execute(select(UserSession).filter(UserSession.refresh_token == token, UserSession.session_end == None))
-            user_session = result.scalars().first()
-
-            if user_session:
-                content_length = request.headers.get("Content-Length")
-                if content_length:
-                    traffic = int(content_length)
-                else:
-                    body = await request.body()
-                    traffic = len(body)
-
-                user_session.traffic += traffic
-                await session.commit()
-
-    return response
+                new_tokens = update_tokens(refresh_token)
+            except HTTPException:
+                await self.reject(refresh_token, session, scope, receive, send)
+                return
+            if current == refresh_token and await session_index.rotate(session, refresh_token, new_tokens[1]) is None:
+                # Токен заменил параллельный запрос (в т.ч. в другом процессе)
+                current = await session_index.resolve(session, refresh_token)
+                if current is None:
+                    await self.deny(payload, scope, receive, send)
+                    return
+            if current != refresh_token:
+                # Новый access token и уже выданный refresh token сессии
+                new_tokens = (new_tokens[0], current)
+            user_id = payload.get("user_id")
+            logger.info(f"Access token обновлен для пользователя {payload.get('username')}")
+        elif not auth_header and refresh_token and decode_token(refresh_token) is None:
+            await self.reject(refresh_token, session, scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_counted():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_refreshed(message):
+            if message["type"] == "http.response.start" and new_tokens is not None:
+                new_access_token, new_refresh_token = new_tokens
+                cookie = Response()
+                set_tokens_cookie(cookie, new_refresh_token)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"authorization", f"Bearer {new_access_token}".encode("latin-1")),
+                    *((name, value) for name, value in cookie.raw_headers if name == b"set-cookie"),
+                ]
+            await send(message)
+
+        await self.app(scope, receive_counted, send_refreshed)
+
+        # Traffic tracking: только запросы с проверенным токеном; счетчик пользователя
+        # в памяти, запись в БД - пакетно в фоне (api.auth.traffic)
+        if user_id is not None:
+            content_length = request.headers.get("content-length")
+            traffic_accounting.add(user_id, int(content_length) if content_length else received)
+
+    # Refresh token is invalid or expired.
+    # Сессию завершает только токен с верной подписью (срок действия не проверяется),
+    # и только если он текущий токен сессии: cookie с поддельным токеном просто
+    # сбрасывается, без обращения к БД
+    async def reject(self, refresh_token, session, scope, receive, send):
+        try:
+            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+        except JWTError:
+            payload = None
+        response = JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Refresh token истек"})
+        response.delete_cookie("refresh_token")
+        if payload is None:
+            logger.warning("Refresh token с неверной подписью")
+        else:
+            logger.info(f"Refresh token истек для пользователя {payload.get('username')}")
+            if payload.get("user_id") is not None:
+                await end_user_session(payload.get("user_id"), session, response, refresh_token)
+        await response(scope, receive, send)
+
+    # Действующий refresh token без активной сессии: сессию не трогаем, cookie не сбрасываем
+    # (в браузере она может быть уже заменена ответом на параллельный запрос)
+    async def deny(self, payload, scope, receive, send):
+        logger.info(f"Refresh token не относится к активной сессии пользователя {payload.get('username')}")
+        response = JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Сессия не активна"})
+        await response(scope, receive, send)
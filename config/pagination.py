@@ -0,0 +1,43 @@
+# config/pagination.py
+import base64
+import binascii
+from typing import Optional
+from fastapi import HTTPException, Response
+
+
+# Курсор - непрозрачная строка с id последней записи страницы
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, last_id = value.split(":", 1)
+        if prefix != "id":
+            raise ValueError(value)
+        return int(last_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+# Зависимость для списков: id, после которого начинается страница (after_id или cursor)
+def after_id_param(after_id: Optional[int] = None, cursor: Optional[str] = None) -> Optional[int]:
+    if cursor:
+        return decode_cursor(cursor)
+    return after_id
+
+
+# Страница списка. С курсором - WHERE id > after_id без OFFSET, и любая страница
+# стоит столько же, сколько первая; без курсора - прежний skip/limit.
+def paginate(query, id_column, skip: int, limit: int, after_id: Optional[int] = None):
+    query = query.order_by(id_column).limit(limit)
+    if after_id is not None:
+        return query.where(id_column > after_id)
+    return query.offset(skip)
+
+
+# Курсор следующей страницы передается в заголовке X-Next-Cursor
+def set_next_cursor(response: Response, items, limit: int):
+    if items and len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1].id)
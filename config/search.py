@@ -0,0 +1,112 @@
+# config/search.py
+import asyncio
+import time
+from bisect import bisect_left
+from typing import List
+from pydantic import BaseModel
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.dict.Etsng.models import Etsng
+from api.dict.Gng.models import Gng
+from api.dict.Station.models import Station
+
+
+class SearchItem(BaseModel):
+    id: int
+    code: str
+    name: str
+
+
+def like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Условие поиска: код начинается с q или наименование содержит q без учета регистра.
+# На PostgreSQL обслуживается индексами code varchar_pattern_ops и name gin_trgm_ops.
+def search_filter(model, q: str):
+    pattern = like_escape(q.strip())
+    return or_(
+        model.code.like(f"{pattern}%", escape="\\"),
+        model.name.ilike(f"%{pattern}%", escape="\\"),
+    )
+
+
+# Длина n-грамм индекса наименований
+NGRAM_SIZE = 3
+
+
+# Подстроки value длиной size
+def ngrams(value: str, size: int):
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+# Индекс справочника в памяти для автодополнения: коды отсортированы для поиска
+# по префиксу через bisect, наименования (в нижнем регистре) разложены на n-граммы
+# длиной до NGRAM_SIZE: подстрока ищется только среди строк из списка самой редкой
+# n-граммы запроса, без просмотра всего справочника.
+# Строится при первом запросе, сбрасывается при изменении справочника
+# и перестраивается не реже чем раз в ttl секунд (изменения из других процессов).
+class SearchIndex:
+    def __init__(self, model, ttl: int = 600):
+        self.model = model
+        self.ttl = ttl
+        self.lock = asyncio.Lock()
+        self.items = None
+        self.codes = []
+        self.names = []
+        self.grams = {}
+        self.built_at = 0.0
+
+    def invalidate(self):
+        self.items = None
+
+    def is_fresh(self):
+        return self.items is not None and time.monotonic() - self.built_at < self.ttl
+
+    async def ensure(self, session: AsyncSession):
+        if self.is_fresh():
+            return
+        async with self.lock:
+            if self.is_fresh():
+                return
+            result = await session.execute(select(self.model.id, self.model.code, self.model.name))
+            self.build(result.all())
+
+    def build(self, rows):
+        items = sorted((row.code or "", row.id, row.name or "") for row in rows)
+        self.codes = [code for code, _, _ in items]
+        self.names = [name.lower() for _, _, name in items]
+        grams = {}
+        for position, name in enumerate(self.names):
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(name, size):
+                    grams.setdefault(gram, []).append(position)
+        self.grams = grams
+        self.items = items
+        self.built_at = time.monotonic()
+
+    def search(self, q: str, limit: int = 10) -> List[SearchItem]:
+        q = q.strip()
+        if not q or not self.items:
+            return []
+        found = []
+        # Сначала совпадения по префиксу кода, затем по подстроке наименования
+        start = bisect_left(self.codes, q)
+        end = start
+        while end < len(self.codes) and self.codes[end].startswith(q) and end - start < limit:
+            found.append(end)
+            end += 1
+        needle = q.lower()
+        candidates = min((self.grams.get(gram, []) for gram in ngrams(needle, min(len(needle), NGRAM_SIZE))), key=len)
+        for position in candidates:
+            if len(found) >= limit:
+                break
+            if needle in self.names[position] and not start <= position < end:
+                found.append(position)
+        return [SearchItem(id=self.items[i][1], code=self.items[i][0], name=self.items[i][2]) for i in found]
+
+
+# Индексы автодополнения справочников; сбрасываются роутами справочников и загрузкой справочников РЖД
+station_index = SearchIndex(Station)
+etsng_index = SearchIndex(Etsng)
+gng_index = SearchIndex(Gng)
@@ -2,7 +2,6 @@ import sys, os
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.base import BaseHTTPMiddleware
 
 # Добавьте корневую директорию проекта в путь поиска модулей
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,10 +10,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 templates = Jinja2Templates(directory="templates")
 
 # Импорт Middleware
-from config.middleware import db_session_middleware, add_cors_middleware
+from config.middleware import DbSessionMiddleware, add_cors_middleware
 from api.auth.routes.users import create_initial_user
 from config.db import async_session
 from config.router import get_routers
+from api.imports.dislocation_sync import dislocation_sync
+from api.imports.data1c_jobs import import_1c_jobs
+from api.auth.traffic import traffic_accounting
+from api.auth.session_index import session_index
 
 
 def create_app() -> FastAPI:
@@ -31,7 +34,7 @@ def create_app() -> FastAPI:
     add_cors_middleware(app)
 
     # Подключение DB session middleware
-    app.add_middleware(BaseHTTPMiddleware, dispatch=db_session_middleware)
+    app.add_middleware(DbSessionMiddleware)
 
     # Подключение статических файлов
     app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -50,6 +53,20 @@ def create_app() -> FastAPI:
     async def startup_event():
         async with async_session() as session:
             await create_initial_user(session)
+            # Индекс активных сессий для проверки refresh token без запроса к БД
+            await session_index.load(session)
+        # Фоновая загрузка дислокации по расписанию
+        dislocation_sync.start()
+        # Очередь заданий загрузки из 1С
+        import_1c_jobs.start()
+        # Пакетная запись трафика сессий
+        traffic_accounting.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await dislocation_sync.stop()
+        await import_1c_jobs.stop()
+        await traffic_accounting.stop()
 
     # Подключение роутеров
     get_routers(app)
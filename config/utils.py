@@ -1,14 +1,85 @@
 # config/utils.py
 
 # хэширования паролей
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
 from passlib.context import CryptContext
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Стоимость bcrypt (log2 числа раундов); существующие хэши проверяются с их собственной стоимостью
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Потоки для bcrypt и предел очереди ожидающих вызовов (сверх него - 503)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+password_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 def verify_password(plain_password, hashed_password):
     return password_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return password_context.hash(password)
 
+
+# Пул потоков для bcrypt: хэширование не блокирует цикл событий, а одновременно
+# выполняется не больше PASSWORD_HASH_WORKERS вызовов. Метрики - время ожидания
+# в очереди и выполнения, текущая и максимальная длина очереди.
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.metrics = {"calls": 0, "rejected": 0, "max_queued": 0, "wait_total": 0.0, "wait_max": 0.0, "run_total": 0.0}
+
+    async def run(self, func, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            self.metrics["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Сервер перегружен, повторите попытку")
+        self.pending += 1
+        self.metrics["max_queued"] = max(self.metrics["max_queued"], self.pending - self.workers)
+        submitted = time.perf_counter()
+        try:
+            started, finished, result = await asyncio.get_running_loop().run_in_executor(self.executor, timed, func, *args)
+        finally:
+            self.pending -= 1
+        self.metrics["calls"] += 1
+        self.metrics["wait_total"] += started - submitted
+        self.metrics["wait_max"] = max(self.metrics["wait_max"], started - submitted)
+        self.metrics["run_total"] += finished - started
+        return result
+
+    async def verify(self, plain_password, hashed_password):
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password):
+        return await self.run(get_password_hash, password)
+
+    def stats(self):
+        calls = self.metrics["calls"] or 1
+        return {
+            "workers": self.workers,
+            "rounds": BCRYPT_ROUNDS,
+            "running": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "calls": self.metrics["calls"],
+            "rejected": self.metrics["rejected"],
+            "max_queued": self.metrics["max_queued"],
+            "wait_avg_ms": round(self.metrics["wait_total"] / calls * 1000, 1),
+            "wait_max_ms": round(self.metrics["wait_max"] * 1000, 1),
+            "run_avg_ms": round(self.metrics["run_total"] / calls * 1000, 1),
+        }
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return started, time.perf_counter(), result
+
+
+password_hasher = PasswordHasher()
+
 # форматирование даты
 from datetime import datetime
 def format_date(date_str):
@@ -1,15 +1,36 @@
-from fastapi import Request, Depends
+from typing import Optional
+from fastapi import Request, Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.imports.data1c import receive_json_1c
+from api.imports.data1c import get_watermarks
+from api.imports.data1c_jobs import import_1c_jobs
 from api.imports.dicts_rw.data_rw import load_rw_json
-from api.imports.dislocation import load_dislocation
+from api.imports.dislocation_sync import dislocation_sync
 from config.settings import app, templates
 from config.db import get_db
 
 
+# Выгрузка 1С сохраняется и загружается фоновым заданием, ответ - id задания.
+# Дельта-обмен: версия обмена в ?version= или X-Exchange-Version, удаленные записи -
+# {"guid": ..., "deleted": true} в своем разделе
 @app.post("/1c", tags=["Импорт данных"])
-async def post_1c(request: Request, db: AsyncSession = Depends(get_db)):
-    return await receive_json_1c(request, db)
+async def post_1c(request: Request, version: Optional[int] = None,
+                  x_exchange_version: Optional[int] = Header(None)):
+    return await import_1c_jobs.submit(request, version if version is not None else x_exchange_version)
+
+
+# Последние примененные версии обмена по разделам: 1С запрашивает изменения новее них
+@app.get("/1c/watermark", tags=["Импорт данных"])
+async def get_1c_watermark(db: AsyncSession = Depends(get_db)):
+    return await get_watermarks(db)
+
+
+# Ход и результат задания загрузки из 1С: счетчики и время по разделам, ошибки
+@app.get("/1c/jobs/{job_id}", tags=["Импорт данных"])
+async def get_1c_job(job_id: str):
+    job = await import_1c_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.post("/load_dicts_rw", tags=["Импорт данных"])
@@ -17,9 +38,16 @@ async def post_rw(request: Request, db: AsyncSession = Depends(get_db)):
     return await load_rw_json(request, db)
 
 
+# Загрузка дислокации ставится в очередь фоновой задачи, ответ - сразу
 @app.post("/load_dislocation", tags=["Импорт данных"])
-async def post_disclocation(request: Request, db: AsyncSession = Depends(get_db)):
-    return await load_dislocation(request, db)
+async def post_disclocation():
+    return dislocation_sync.trigger()
+
+
+# Состояние фоновой загрузки дислокации: длительность и количество строк последнего запуска
+@app.get("/load_dislocation", tags=["Импорт данных"])
+async def get_disclocation_status():
+    return dislocation_sync.status()
 
 
 # root
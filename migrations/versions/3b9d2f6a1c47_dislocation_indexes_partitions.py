@@ -0,0 +1,102 @@
+"""dislocation indexes and monthly partitions
+
+Revision ID: 3b9d2f6a1c47
+Revises: c4f1b6a8e259
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f6a1c47'
+down_revision: Union[str, None] = 'c4f1b6a8e259'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Индексы под основные фильтры истории дислокации
+INDEXES = [
+    ("ix_dislocation_date", ["date"]),
+    ("ix_dislocation_date_oper", ["date_oper"]),
+    ("ix_dislocation_wagon_id_date_oper", ["wagon_id", "date_oper"]),
+    ("ix_dislocation_container_id_date_oper", ["container_id", "date_oper"]),
+    ("ix_dislocation_station_tek_id_date_oper", ["station_tek_id", "date_oper"]),
+]
+
+FOREIGN_KEYS = [
+    ("wagon_id", "wagons"),
+    ("container_id", "containers"),
+    ("station_otpr_id", "stations"),
+    ("station_tek_id", "stations"),
+    ("station_nazn_id", "stations"),
+    ("etsng_id", "etsng"),
+    ("prev_etsng_id", "etsng"),
+]
+
+# Секции по месяцам: от самой ранней записи до трех месяцев вперед, плюс секция по умолчанию
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    m date := date_trunc('month', COALESCE((SELECT min(date) FROM dislocation_old), now()))::date;
+    last_month date := (date_trunc('month', now()) + interval '3 months')::date;
+BEGIN
+    WHILE m <= last_month LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF dislocation FOR VALUES FROM (%L) TO (%L)',
+                       'dislocation_y' || to_char(m, 'YYYY') || 'm' || to_char(m, 'MM'),
+                       m, (m + interval '1 month')::date);
+        m := (m + interval '1 month')::date;
+    END LOOP;
+END $$
+"""
+CREATE_DEFAULT_PARTITION = "CREATE TABLE IF NOT EXISTS dislocation_default PARTITION OF dislocation DEFAULT"
+
+
+def create_constraints_and_indexes(primary_key) -> None:
+    op.execute(f"ALTER TABLE dislocation ADD CONSTRAINT dislocation_pkey PRIMARY KEY ({primary_key})")
+    op.execute("ALTER SEQUENCE dislocation_id_seq OWNED BY dislocation.id")
+    for column, table in FOREIGN_KEYS:
+        op.create_foreign_key(f"dislocation_{column}_fkey", "dislocation", table, [column], ["id"])
+    op.create_index("ix_dislocation_id", "dislocation", ["id"])
+
+
+def rename_old_table() -> None:
+    op.execute("ALTER TABLE dislocation RENAME TO dislocation_old")
+    op.execute("ALTER INDEX IF EXISTS dislocation_pkey RENAME TO dislocation_old_pkey")
+    op.execute("ALTER INDEX IF EXISTS ix_dislocation_id RENAME TO ix_dislocation_old_id")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, columns in INDEXES:
+            op.create_index(name, "dislocation", columns)
+        return
+
+    # Ключ секционирования должен входить в первичный ключ и не может быть NULL
+    op.execute("UPDATE dislocation SET date = now() WHERE date IS NULL")
+    rename_old_table()
+    op.execute("CREATE TABLE dislocation (LIKE dislocation_old INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+    op.execute("ALTER TABLE dislocation ALTER COLUMN date SET NOT NULL")
+    create_constraints_and_indexes("id, date")
+    op.execute(CREATE_PARTITIONS)
+    op.execute(CREATE_DEFAULT_PARTITION)
+    op.execute("INSERT INTO dislocation SELECT * FROM dislocation_old")
+    op.execute("DROP TABLE dislocation_old")
+    for name, columns in INDEXES:
+        op.create_index(name, "dislocation", columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="dislocation")
+        return
+
+    rename_old_table()
+    op.execute("CREATE TABLE dislocation (LIKE dislocation_old INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE dislocation ALTER COLUMN date DROP NOT NULL")
+    create_constraints_and_indexes("id")
+    op.execute("INSERT INTO dislocation SELECT * FROM dislocation_old")
+    op.execute("DROP TABLE dislocation_old CASCADE")
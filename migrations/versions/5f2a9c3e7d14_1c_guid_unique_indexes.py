@@ -0,0 +1,46 @@
+"""unique guid indexes for 1C directories
+
+Revision ID: 5f2a9c3e7d14
+Revises: 8c1e4a7d2b90
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c3e7d14'
+down_revision: Union[str, None] = '8c1e4a7d2b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    "currencies",
+    "countries",
+    "vat",
+    "banks",
+    "organizations",
+    "contractors",
+    "bank_accounts_org",
+    "bank_accounts",
+    "contracts",
+]
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        # Дубли guid: ключ остается у первой записи, у остальных guid очищается
+        op.execute(
+            f"UPDATE {table} SET guid = '' WHERE guid <> '' AND id NOT IN "
+            f"(SELECT min(id) FROM {table} WHERE guid <> '' GROUP BY guid)"
+        )
+        op.create_index(f"ux_{table}_guid", table, ["guid"], unique=True,
+                        postgresql_where=sa.text("guid <> ''"), sqlite_where=sa.text("guid <> ''"))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ux_{table}_guid", table_name=table)
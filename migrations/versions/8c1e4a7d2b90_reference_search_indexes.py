@@ -0,0 +1,38 @@
+"""search indexes for stations, etsng and gng
+
+Revision ID: 8c1e4a7d2b90
+Revises: 3b9d2f6a1c47
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e4a7d2b90'
+down_revision: Union[str, None] = '3b9d2f6a1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["stations", "etsng", "gng"]
+
+
+def upgrade() -> None:
+    # На PostgreSQL: btree varchar_pattern_ops для LIKE 'код%' и триграммный GIN
+    # для ILIKE '%наименование%'; на прочих СУБД - обычные индексы
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        op.create_index(f"ix_{table}_code_pattern", table, ["code"],
+                        postgresql_ops={"code": "varchar_pattern_ops"})
+        op.create_index(f"ix_{table}_name_trgm", table, ["name"],
+                        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_name_trgm", table_name=table)
+        op.drop_index(f"ix_{table}_code_pattern", table_name=table)
@@ -0,0 +1,42 @@
+"""source_hash column for 1C directories
+
+Revision ID: 9d4b6e1f0a25
+Revises: 5f2a9c3e7d14
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b6e1f0a25'
+down_revision: Union[str, None] = '5f2a9c3e7d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    "currencies",
+    "countries",
+    "vat",
+    "banks",
+    "organizations",
+    "contractors",
+    "bank_accounts_org",
+    "bank_accounts",
+    "contracts",
+]
+
+
+def upgrade() -> None:
+    # Пустой хеш у существующих строк: первый обмен после миграции перезапишет их один раз
+    for table in TABLES:
+        op.add_column(table, sa.Column("source_hash", sa.String(32), nullable=True, server_default=""))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("source_hash")
@@ -0,0 +1,69 @@
+"""dislocation_current table: current position of each wagon/container
+
+Revision ID: a2c7e9d1f380
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c7e9d1f380'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dislocation_current",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("unit_key", sa.String(50), nullable=False, unique=True),
+        sa.Column("date", sa.DateTime()),
+        sa.Column("loaded", sa.Boolean()),
+        sa.Column("nomer_nakladnoi", sa.String(30)),
+        sa.Column("date_otpr", sa.Date()),
+        sa.Column("date_otpr_time", sa.DateTime()),
+        sa.Column("date_oper", sa.Date()),
+        sa.Column("date_arrive", sa.Date(), nullable=True),
+        sa.Column("date_arrive_plan", sa.Date(), nullable=True),
+        sa.Column("operation", sa.String(300)),
+        sa.Column("operation_id", sa.String(300)),
+        sa.Column("operation_code", sa.String(300)),
+        sa.Column("broken", sa.Boolean()),
+        sa.Column("weight", sa.Numeric(15, 4)),
+        sa.Column("distance_end", sa.Integer()),
+        sa.Column("distance_full", sa.Integer()),
+        sa.Column("group_name", sa.String(50)),
+        sa.Column("group_id", sa.String(50)),
+        sa.Column("gruz_sender", sa.String(200)),
+        sa.Column("gruz_receiver", sa.String(200)),
+        sa.Column("payer", sa.String(200)),
+        sa.Column("owner", sa.String(200)),
+        sa.Column("owner_code", sa.String(200)),
+        sa.Column("next_repair", sa.Date(), nullable=True),
+        sa.Column("next_repair_type", sa.String(200)),
+        sa.Column("days_wo_movement", sa.Numeric(15, 2)),
+        sa.Column("days_wo_operation", sa.Numeric(15, 2)),
+        sa.Column("days_in_transit", sa.Numeric(15, 2)),
+        sa.Column("vagon_comment", sa.String(200)),
+        sa.Column("wagon_id", sa.Integer(), sa.ForeignKey("wagons.id"), nullable=True),
+        sa.Column("container_id", sa.Integer(), sa.ForeignKey("containers.id"), nullable=True),
+        sa.Column("station_otpr_id", sa.Integer(), sa.ForeignKey("stations.id"), nullable=True),
+        sa.Column("station_tek_id", sa.Integer(), sa.ForeignKey("stations.id"), nullable=True),
+        sa.Column("station_nazn_id", sa.Integer(), sa.ForeignKey("stations.id"), nullable=True),
+        sa.Column("etsng_id", sa.Integer(), sa.ForeignKey("etsng.id"), nullable=True),
+        sa.Column("prev_etsng_id", sa.Integer(), sa.ForeignKey("etsng.id"), nullable=True),
+    )
+    op.create_index("ix_dislocation_current_id", "dislocation_current", ["id"])
+    op.create_index("ix_dislocation_current_wagon_id", "dislocation_current", ["wagon_id"])
+    op.create_index("ix_dislocation_current_container_id", "dislocation_current", ["container_id"])
+    op.create_index("ix_dislocation_current_station_tek_id", "dislocation_current", ["station_tek_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("dislocation_current")
@@ -0,0 +1,29 @@
+"""user_sessions.previous_refresh_token / rotated_at: grace window for rotated refresh tokens
+
+Revision ID: a6d1e3f7b258
+Revises: f4c9d2e8a613
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d1e3f7b258'
+down_revision: Union[str, None] = 'f4c9d2e8a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("user_sessions", sa.Column("previous_refresh_token", sa.String(length=255), nullable=True))
+    op.add_column("user_sessions", sa.Column("rotated_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("user_sessions") as batch_op:
+        batch_op.drop_column("rotated_at")
+        batch_op.drop_column("previous_refresh_token")
@@ -0,0 +1,31 @@
+"""import_watermarks table for 1C delta exchanges
+
+Revision ID: b7e3f5a90c12
+Revises: 9d4b6e1f0a25
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f5a90c12'
+down_revision: Union[str, None] = '9d4b6e1f0a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_watermarks",
+        sa.Column("entity", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("import_watermarks")
@@ -0,0 +1,27 @@
+"""dislocation_current.fingerprint for skipping unchanged rows
+
+Revision ID: c4f1b6a8e259
+Revises: a2c7e9d1f380
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f1b6a8e259'
+down_revision: Union[str, None] = 'a2c7e9d1f380'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("dislocation_current", sa.Column("fingerprint", sa.String(32), server_default="", nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("dislocation_current") as batch_op:
+        batch_op.drop_column("fingerprint")
@@ -0,0 +1,31 @@
+"""import_checksums table for the RW reference snapshot
+
+Revision ID: e2a8c4b61d37
+Revises: b7e3f5a90c12
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8c4b61d37'
+down_revision: Union[str, None] = 'b7e3f5a90c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_checksums",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("checksum", sa.String(64), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("import_checksums")
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from api.imports.streaming import JsonSectionParser
+
+# Документ с числами всех видов, строками с экранированием и не-ASCII символами
+DOCUMENT = json.dumps({
+    "Currency": [{"guid": "a1", "code": 643, "rate": 1.5e3, "name": "Рубль"}, {"guid": "a2", "rate": -0.25}],
+    "Empty": [],
+    "Scalar": 12345,
+    "Float": -1.25E-7,
+    "Nested": [{"items": [1, 2.0, {"x": "\"кавычки\" \\ ☃"}], "flag": True, "none": None}],
+    "Last": [10, 20e1, 3.5],
+}, ensure_ascii=False).encode()
+
+
+def expected_events():
+    return [
+        (section, item)
+        for section, value in json.loads(DOCUMENT).items()
+        for item in (value if isinstance(value, list) else [value])
+    ]
+
+
+def parse_chunks(chunks):
+    parser = JsonSectionParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    return events
+
+
+@pytest.mark.parametrize("offset", range(len(DOCUMENT) + 1))
+def test_split_at_every_offset(offset):
+    assert parse_chunks([DOCUMENT[:offset], DOCUMENT[offset:]]) == expected_events()
+
+
+def test_byte_by_byte():
+    assert parse_chunks([DOCUMENT[i:i + 1] for i in range(len(DOCUMENT))]) == expected_events()
+
+
+@pytest.mark.parametrize("document", [b'{"a": 1.5e3}', b'{"a": [1.5e-3, -2]}', b'{"a": -10.0E+2}'])
+def test_number_split_after_sign_dot_exponent(document):
+    for offset in range(len(document) + 1):
+        assert parse_chunks([document[:offset], document[offset:]]) == parse_chunks([document])
+
+
+def test_truncated_document_fails():
+    with pytest.raises(json.JSONDecodeError):
+        parse_chunks([DOCUMENT[:-3]])
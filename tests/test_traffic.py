@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.auth.models import UserSession
+from api.auth.traffic import TrafficAccounting
+
+
+async def flush_traffic(url, counts):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(UserSession.__table__.create)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession)
+    async with session_factory() as session:
+        session.add_all([
+            UserSession(id=1, user_id=1, refresh_token="a", traffic=10),
+            UserSession(id=2, user_id=1, refresh_token="b", traffic=0, session_end=datetime.now()),
+            UserSession(id=3, user_id=2, refresh_token="c", traffic=0),
+        ])
+        await session.commit()
+
+    accounting = TrafficAccounting(session_factory=session_factory)
+    for user_id, traffic in counts:
+        accounting.add(user_id, traffic)
+    flushed = await accounting.flush()
+
+    async with session_factory() as session:
+        result = await session.execute(select(UserSession.id, UserSession.traffic).order_by(UserSession.id))
+        traffic = dict(result.all())
+    await engine.dispose()
+    return flushed, accounting.pending, traffic
+
+
+def test_flush_adds_traffic_to_active_session(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'traffic.db'}"
+    flushed, pending, traffic = asyncio.run(flush_traffic(url, [(1, 100), (1, 50), (2, 7), (3, 5), (2, 0)]))
+
+    assert flushed == 3
+    assert pending == {}
+    # Завершенная сессия пользователя 1 не меняется, у пользователя 3 сессии нет
+    assert traffic == {1: 160, 2: 0, 3: 7}
+
+
+def test_flush_without_traffic_changes_nothing(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'traffic.db'}"
+    flushed, pending, traffic = asyncio.run(flush_traffic(url, []))
+
+    assert flushed == 0
+    assert traffic == {1: 10, 2: 0, 3: 0}